@@ -1,53 +1,65 @@
 # main.py
 import sys
 import os
-import io
-import requests
-import qrcode
-from PIL import Image
-from dotenv import load_dotenv
+import threading
+import time
+
+import engine
+import metrics
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton, QFileDialog,
     QVBoxLayout, QHBoxLayout, QTextEdit, QComboBox, QTabWidget, QColorDialog,
-    QMessageBox, QProgressBar, QCheckBox
+    QMessageBox, QProgressBar, QCheckBox, QTableWidget, QTableWidgetItem, QHeaderView,
+    QAbstractItemView
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QMimeData
-from PyQt5.QtGui import QPixmap, QDragEnterEvent, QDropEvent, QPalette, QColor
-
-# Load .env file
-load_dotenv()
-IMGBB_API_KEY = os.getenv("IMGBB_API_KEY")
-if not IMGBB_API_KEY:
-    print("❌ IMGBB_API_KEY not found in .env")
-    sys.exit(1)
-
-class UploadThread(QThread):
-    success = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-    def __init__(self, image_path):
-        super().__init__()
-        self.image_path = image_path
-
-    def run(self):
-        try:
-            with open(self.image_path, "rb") as file:
-                response = requests.post(
-                    "https://api.imgbb.com/1/upload",
-                    data={"key": IMGBB_API_KEY},
-                    files={"image": file}
-                )
-            if response.status_code == 200:
-                url = response.json()["data"]["url"]
-                self.success.emit(url)
-            else:
-                self.error.emit("Upload failed: " + response.text)
-        except Exception as e:
-            self.error.emit(str(e))
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal, QMimeData
+from PyQt5.QtGui import QPixmap, QImage, QDragEnterEvent, QDropEvent, QPalette, QColor
+
+def pil_to_qimage(img):
+    # QImage (unlike QPixmap) may be built off the GUI thread; copy() detaches
+    # it from the bytes object that is about to go away
+    img = img.convert("RGB")
+    data = img.tobytes()
+    return QImage(data, img.width, img.height, img.width * 3, QImage.Format_RGB888).copy()
+
+def pil_to_qpixmap(img):
+    return QPixmap.fromImage(pil_to_qimage(img))
+
+UPLOAD_WORKERS = 4
+JOURNAL_QUEUE = "qt"
+# Progress bar steps per file, so partial uploads move the bar
+PROGRESS_STEPS = 1000
+METRICS_REFRESH_MS = 1000
+# Quiet period after the last size/colour change before the preview is redrawn
+PREVIEW_DEBOUNCE_MS = 80
+THUMBNAIL_SIZE = 200
+
+class PipelineSignals(QObject):
+    # Pipeline callbacks run on its event-loop thread; signals hop to the GUI
+    started = pyqtSignal(int)
+    prepared = pyqtSignal(int, str)
+    progress = pyqtSignal(int, object, object)
+    success = pyqtSignal(int, str, object, object)
+    error = pyqtSignal(int, str)
+
+    def on_stage(self, job, stage):
+        if stage == "read":
+            self.started.emit(job.tag)
+        elif stage == "recompress" and job.prepared:
+            self.prepared.emit(job.tag, job.prepared.describe(engine.upload_throughput()))
+
+    def on_progress(self, job, sent, total):
+        self.progress.emit(job.tag, sent, total)
+
+    def on_result(self, job):
+        if job.ok:
+            self.success.emit(job.tag, job.url, job.matrix, job.job_id)
+        else:
+            self.error.emit(job.tag, job.error)
 
 class DropLabel(QLabel):
-    fileDropped = pyqtSignal(str)
+    filesDropped = pyqtSignal(list)
 
     def __init__(self):
         super().__init__("\n\nDrop Image Here\n", alignment=Qt.AlignCenter)
@@ -59,21 +71,78 @@ class DropLabel(QLabel):
             event.acceptProposedAction()
 
     def dropEvent(self, event: QDropEvent):
-        for url in event.mimeData().urls():
-            file_path = url.toLocalFile()
-            if os.path.isfile(file_path):
-                self.fileDropped.emit(file_path)
-                break
+        paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        paths = [p for p in paths if os.path.isfile(p)]
+        if paths:
+            self.filesDropped.emit(paths)
 
 class QRCodeApp(QMainWindow):
+    # Emitted from the preview and thumbnail worker threads
+    preview_ready = pyqtSignal(int, object, object)
+    preview_error = pyqtSignal(int, str)
+    thumbnail_ready = pyqtSignal(int, str, object)
+    thumbnail_error = pyqtSignal(int, str, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("🎨 QR Code Generator Pro")
         self.setGeometry(100, 100, 800, 700)
         self.url = ""
-        self.qr_image = None
+        self.qr_matrix = None
         self.dark_mode = False
+        self.job_id = None
+        self.pipeline_signals = PipelineSignals()
+        self.session = engine.UploadSession(
+            JOURNAL_QUEUE,
+            upload_workers=UPLOAD_WORKERS,
+            on_stage=self.pipeline_signals.on_stage,
+            on_progress=self.pipeline_signals.on_progress,
+            on_result=self.pipeline_signals.on_result,
+        )
+        self.pipeline_signals.started.connect(self.upload_started)
+        self.pipeline_signals.prepared.connect(self.upload_prepared)
+        self.pipeline_signals.progress.connect(self.upload_progress)
+        self.pipeline_signals.success.connect(self.upload_success)
+        self.pipeline_signals.error.connect(self.upload_error)
+        self.queue_paths = {}
+        self.queue_urls = {}
+        self.queue_matrices = {}
+        self.queue_job_ids = {}
+        # Bytes sent per queue row while it uploads
+        self.row_sent = {}
+        self.row_fraction = {}
+        self.row_submitted = {}
+        self.profile = None
+        self.preview = engine.PreviewRenderer(self.preview_ready.emit, self.preview_error.emit)
+        self.preview_ready.connect(self.show_preview)
+        self.preview_error.connect(self.preview_failed)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.regenerate_preview)
+        # Image thumbnails are decoded at reduced scale off the GUI thread
+        self.thumbnails = engine.ThumbnailLoader(self.thumbnail_ready.emit, self.thumbnail_error.emit,
+                                                 box=(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.thumbnail_ready.connect(self.show_thumbnail)
+        self.thumbnail_error.connect(self.thumbnail_failed)
+        self.meter = engine.ThroughputMeter()
+        self.batch_total = 0
+        self.batch_done = 0
+        self.batch_errors = []
         self.init_ui()
+        # Imports and .env are loaded once the window is up, not before it
+        QTimer.singleShot(0, self.start_warm_up)
+
+    def start_warm_up(self):
+        threading.Thread(target=engine.warm_up, daemon=True).start()
+        QTimer.singleShot(0, self.resume_jobs)
+
+    def resume_jobs(self):
+        # Uploads the last session did not finish (crash, closed window,
+        # network down) are queued again
+        resumed = self.session.resumable()
+        if resumed:
+            self.upload_images([row["path"] for row in resumed], resumed)
 
     def init_ui(self):
         tabs = QTabWidget()
@@ -86,7 +155,7 @@ class QRCodeApp(QMainWindow):
         layout = QVBoxLayout(widget)
 
         self.drop_label = DropLabel()
-        self.drop_label.fileDropped.connect(self.upload_image)
+        self.drop_label.filesDropped.connect(self.upload_images)
         layout.addWidget(self.drop_label)
 
         self.upload_btn = QPushButton("📤 Browse Image")
@@ -98,6 +167,16 @@ class QRCodeApp(QMainWindow):
         self.image_preview.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.image_preview)
 
+        self.queue_table = QTableWidget(0, 4)
+        self.queue_table.setHorizontalHeaderLabels(["File", "Status", "Saved", "URL"])
+        self.queue_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queue_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.queue_table.setFixedHeight(140)
+        self.queue_table.itemSelectionChanged.connect(self.show_selected_item)
+        layout.addWidget(self.queue_table)
+
         self.progress = QProgressBar()
         self.progress.setVisible(False)
         layout.addWidget(self.progress)
@@ -116,11 +195,12 @@ class QRCodeApp(QMainWindow):
         self.size_box = QComboBox()
         self.size_box.addItems(["Small", "Medium", "Large"])
         self.size_box.setCurrentText("Medium")
+        self.size_box.currentTextChanged.connect(self.restyle_qr)
         size_layout.addWidget(self.size_box)
 
         self.color_btn = QPushButton("🎨 Pick Color")
         self.color_btn.clicked.connect(self.pick_color)
-        self.qr_color = "black"
+        self.qr_color = engine.DEFAULT_STYLE["fill_color"]
         size_layout.addWidget(self.color_btn)
         layout.addLayout(size_layout)
 
@@ -129,10 +209,18 @@ class QRCodeApp(QMainWindow):
         self.qr_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.qr_label)
 
+        save_layout = QHBoxLayout()
         self.save_btn = QPushButton("💾 Save QR Code")
         self.save_btn.clicked.connect(self.save_qr)
         self.save_btn.setEnabled(False)
-        layout.addWidget(self.save_btn)
+        save_layout.addWidget(self.save_btn)
+
+        self.export_set_btn = QPushButton("📦 Export Set")
+        self.export_set_btn.setToolTip(", ".join(engine.DEFAULT_EXPORT_SET))
+        self.export_set_btn.clicked.connect(self.export_qr_set)
+        self.export_set_btn.setEnabled(False)
+        save_layout.addWidget(self.export_set_btn)
+        layout.addLayout(save_layout)
 
         return widget
 
@@ -144,79 +232,312 @@ class QRCodeApp(QMainWindow):
         self.dark_toggle.stateChanged.connect(self.toggle_dark_mode)
         layout.addWidget(self.dark_toggle)
 
+        self.shrink_toggle = QCheckBox("🗜️ Shrink images before upload")
+        layout.addWidget(self.shrink_toggle)
+
+        shrink_layout = QHBoxLayout()
+        shrink_layout.addWidget(QLabel("Max size:"))
+        self.max_dimension_box = QComboBox()
+        self.max_dimension_box.addItems(["1024", "2048", "4096"])
+        self.max_dimension_box.setCurrentText("2048")
+        shrink_layout.addWidget(self.max_dimension_box)
+        shrink_layout.addWidget(QLabel("Format:"))
+        self.shrink_format_box = QComboBox()
+        self.shrink_format_box.addItems(["JPEG", "WEBP"])
+        shrink_layout.addWidget(self.shrink_format_box)
+        layout.addLayout(shrink_layout)
+
         clear_btn = QPushButton("🧹 Clear All")
         clear_btn.clicked.connect(self.clear_all)
         layout.addWidget(clear_btn)
 
+        layout.addWidget(QLabel("⏱️ Performance"))
+        self.metrics_table = QTableWidget(0, 7)
+        self.metrics_table.setHorizontalHeaderLabels(
+            ["Span", "Count", "Mean ms", "p50 ms", "p95 ms", "Max ms", "Histogram"])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.metrics_table)
+
+        metrics_layout = QHBoxLayout()
+        export_metrics_btn = QPushButton("💾 Export Metrics")
+        export_metrics_btn.clicked.connect(self.export_metrics)
+        metrics_layout.addWidget(export_metrics_btn)
+        reset_metrics_btn = QPushButton("↺ Reset")
+        reset_metrics_btn.clicked.connect(self.reset_metrics)
+        metrics_layout.addWidget(reset_metrics_btn)
+        layout.addLayout(metrics_layout)
+
+        self.profile_toggle = QCheckBox("🔬 Capture profile (cProfile + tracemalloc) for a bug report")
+        self.profile_toggle.toggled.connect(self.toggle_profile)
+        layout.addWidget(self.profile_toggle)
+
+        # Only redrawn while the Settings tab is on screen
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        self.metrics_timer.start(METRICS_REFRESH_MS)
+
         return widget
 
     def browse_image(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "Images (*.png *.jpg *.jpeg *.gif)")
-        if path:
-            self.upload_image(path)
+        paths, _ = QFileDialog.getOpenFileNames(self, "Select Images", "", "Images (*.png *.jpg *.jpeg *.gif)")
+        if paths:
+            self.upload_images(paths)
 
-    def upload_image(self, file_path):
-        self.image_preview.setPixmap(QPixmap(file_path).scaled(200, 200, Qt.KeepAspectRatio))
+    def upload_images(self, file_paths, resumed=None):
+        try:
+            self.session.start()
+        except engine.ConfigError as e:
+            QMessageBox.critical(self, "Configuration Error", f"❌ {e}")
+            return
+
+        if not resumed:
+            self.request_thumbnail(file_paths[0])
+            # The rest of the batch is decoded in the background, so
+            # selecting their queue rows shows them at once
+            self.thumbnails.prefetch(file_paths[1:])
+
+        # A new drop while the previous batch is still running joins that batch
+        if self.batch_done == self.batch_total:
+            self.batch_total = 0
+            self.batch_done = 0
+            self.batch_errors = []
+            self.meter.reset()
+        self.batch_total += len(file_paths)
+        recompress = None
+        if self.shrink_toggle.isChecked():
+            recompress = engine.RecompressOptions(
+                max_dimension=int(self.max_dimension_box.currentText()),
+                format=self.shrink_format_box.currentText(),
+            )
+        self.progress.setRange(0, self.batch_total * PROGRESS_STEPS)
+        self.update_progress()
         self.progress.setVisible(True)
-        self.progress.setRange(0, 0)
-        self.thread = UploadThread(file_path)
-        self.thread.success.connect(self.upload_success)
-        self.thread.error.connect(self.upload_error)
-        self.thread.start()
 
-    def upload_success(self, url):
-        self.progress.setVisible(False)
+        for index, file_path in enumerate(file_paths):
+            job = resumed[index] if resumed else None
+            row = self.queue_table.rowCount()
+            self.queue_table.insertRow(row)
+            self.queue_table.setItem(row, 0, QTableWidgetItem(os.path.basename(file_path)))
+            self.queue_table.setItem(row, 1, QTableWidgetItem("Resumed" if job else "Queued"))
+            self.queue_table.setItem(row, 2, QTableWidgetItem(""))
+            self.queue_table.setItem(row, 3, QTableWidgetItem(""))
+            self.queue_paths[row] = file_path
+            self.row_submitted[row] = time.perf_counter()
+            if job:
+                self.session.resume(job, tag=row)
+            else:
+                self.session.submit(file_path, tag=row, recompress=recompress)
+
+    def upload_started(self, row):
+        self.queue_table.item(row, 1).setText("Uploading")
+
+    def upload_prepared(self, row, summary):
+        self.queue_table.item(row, 2).setText(summary)
+
+    def upload_progress(self, row, sent, total):
+        # A retry rewinds the upload, so bytes sent can go backwards
+        self.meter.add(max(0, sent - self.row_sent.get(row, 0)))
+        self.row_sent[row] = sent
+        self.row_fraction[row] = sent / total if total else 1.0
+        self.queue_table.item(row, 1).setText(f"Uploading {self.row_fraction[row]:.0%}")
+        self.update_progress()
+
+    def update_progress(self):
+        # Whole files done plus the part of each in-flight upload already sent
+        done = self.batch_done + sum(self.row_fraction.values())
+        self.progress.setValue(int(done * PROGRESS_STEPS))
+        rate = engine.format_rate(self.meter.rate())
+        self.progress.setFormat(f"{self.batch_done} / {self.batch_total}" + (f"  ·  {rate}" if rate else ""))
+
+    def upload_success(self, row, url, matrix, job_id=None):
+        self.queue_table.item(row, 1).setText("Done")
+        self.queue_table.item(row, 3).setText(url)
+        self.queue_urls[row] = url
+        self.queue_matrices[row] = matrix
+        self.queue_job_ids[row] = job_id
+        self.show_url(url, matrix, job_id)
+        if row in self.row_submitted:
+            metrics.observe("drop_to_preview", time.perf_counter() - self.row_submitted.pop(row))
+        self.upload_finished(row)
+
+    def upload_error(self, row, err):
+        self.queue_table.item(row, 1).setText("Failed")
+        self.queue_table.item(row, 1).setToolTip(err)
+        self.batch_errors.append(f"{self.queue_table.item(row, 0).text()}: {err}")
+        self.upload_finished(row)
+
+    def upload_finished(self, row):
+        self.row_sent.pop(row, None)
+        self.row_fraction.pop(row, None)
+        self.row_submitted.pop(row, None)
+        self.batch_done += 1
+        self.update_progress()
+        if self.batch_done == self.batch_total:
+            self.progress.setVisible(False)
+            if self.batch_errors:
+                QMessageBox.critical(self, "Upload Failed", "\n\n".join(self.batch_errors))
+
+    def show_selected_item(self):
+        rows = self.queue_table.selectionModel().selectedRows()
+        if rows and rows[0].row() in self.queue_paths:
+            self.request_thumbnail(self.queue_paths[rows[0].row()])
+        if rows and rows[0].row() in self.queue_urls:
+            row = rows[0].row()
+            self.show_url(self.queue_urls[row], self.queue_matrices[row], self.queue_job_ids.get(row))
+
+    def request_thumbnail(self, path):
+        self.thumbnails.request(path, convert=pil_to_qimage)
+
+    def show_thumbnail(self, token, path, qimage):
+        if self.thumbnails.is_current(token):
+            self.image_preview.setPixmap(QPixmap.fromImage(qimage))
+
+    def thumbnail_failed(self, token, path, message):
+        if self.thumbnails.is_current(token):
+            self.image_preview.setText(f"No preview for {os.path.basename(path)}")
+
+    def show_url(self, url, matrix=None, job_id=None):
         self.url = url
+        self.job_id = job_id
         self.url_display.setText(url)
         self.copy_btn.setEnabled(True)
         self.save_btn.setEnabled(True)
-        self.generate_qr(url)
-
-    def upload_error(self, err):
-        self.progress.setVisible(False)
-        QMessageBox.critical(self, "Upload Failed", err)
+        self.export_set_btn.setEnabled(True)
+        self.generate_qr(url, matrix)
 
     def copy_url(self):
         QApplication.clipboard().setText(self.url)
 
-    def generate_qr(self, data):
+    def generate_qr(self, data, matrix=None):
         size_map = {"Small": 200, "Medium": 300, "Large": 400}
         size = size_map[self.size_box.currentText()]
-        qr = qrcode.QRCode(box_size=10, border=4)
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color=self.qr_color, back_color="white")
-        self.qr_image = img
-
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        pixmap = QPixmap()
-        pixmap.loadFromData(buffer.getvalue())
-        self.qr_label.setPixmap(pixmap.scaled(size, size, Qt.KeepAspectRatio))
+        # Only the matrix is kept; saving exports from it at whatever size is asked
+        if matrix is not None:
+            self.qr_matrix = matrix
+
+        # Encoding (if needed) and rasterizing run on the preview worker;
+        # a newer request supersedes this one
+        self.preview_timer.stop()
+        self.preview.request(size, self.qr_color, engine.DEFAULT_STYLE["back_color"], matrix=matrix, data=data,
+                             qr_options=engine.qr_options(), convert=pil_to_qimage)
+
+    def show_preview(self, token, matrix, qimage):
+        if not self.preview.is_current(token):
+            return
+        self.qr_matrix = matrix
+        with metrics.span("preview"):
+            self.qr_label.setPixmap(QPixmap.fromImage(qimage))
+
+    def preview_failed(self, token, message):
+        # e.g. the data no longer fits at the chosen error correction
+        if self.preview.is_current(token):
+            self.qr_label.setText(f"No QR preview: {message}")
+
+    def restyle_qr(self, *args):
+        # Color/size only change the raster; the cached matrix is reused.
+        # Restarting the timer coalesces a burst of changes into one render.
+        if self.url:
+            self.preview_timer.start()
+
+    def regenerate_preview(self):
+        if self.url:
+            self.generate_qr(self.url, self.qr_matrix)
 
     def pick_color(self):
         color = QColorDialog.getColor()
         if color.isValid():
             self.qr_color = color.name()
-            if self.url:
-                self.generate_qr(self.url)
+            self.restyle_qr()
 
     def save_qr(self):
-        if self.qr_image:
-            path, _ = QFileDialog.getSaveFileName(self, "Save QR Code", "qr_code.png", "PNG Files (*.png)")
+        if self.qr_matrix:
+            path, _ = QFileDialog.getSaveFileName(self, "Save QR Code", "qr_code.png",
+                                                  "PNG Files (*.png);;SVG Files (*.svg);;PDF Files (*.pdf)")
             if path:
-                self.qr_image.save(path)
+                try:
+                    engine.save(self.qr_matrix, path, style={"fill_color": self.qr_color})
+                    self.session.mark_exported(self.job_id)
+                except Exception as e:
+                    QMessageBox.critical(self, "Save Failed", str(e))
+
+    def export_qr_set(self):
+        if self.qr_matrix:
+            folder = QFileDialog.getExistingDirectory(self, "Export QR Code Set")
+            if folder:
+                try:
+                    paths = engine.export_set(self.qr_matrix, os.path.join(folder, "qr_code"),
+                                              style={"fill_color": self.qr_color})
+                    self.session.mark_exported(self.job_id)
+                except Exception as e:
+                    QMessageBox.critical(self, "Export Failed", str(e))
+                    return
+                QMessageBox.information(self, "Exported", "\n".join(os.path.basename(p) for p in paths))
+
+    def refresh_metrics(self):
+        if not self.metrics_table.isVisible():
+            return
+        rows = metrics.REGISTRY.rows()
+        self.metrics_table.setRowCount(len(rows))
+        for row, (name, count, mean, p50, p95, peak, spark) in enumerate(rows):
+            values = [name, str(count)] + [f"{v * 1000:.1f}" for v in (mean, p50, p95, peak)] + [spark]
+            for column, value in enumerate(values):
+                self.metrics_table.setItem(row, column, QTableWidgetItem(value))
+
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "metrics.json",
+                                              "JSON (*.json);;Prometheus text (*.prom)")
+        if path:
+            try:
+                metrics.export(path)
+            except Exception as e:
+                QMessageBox.critical(self, "Export Failed", str(e))
+
+    def reset_metrics(self):
+        metrics.REGISTRY.reset()
+        self.metrics_table.setRowCount(0)
+
+    def toggle_profile(self, enabled):
+        if enabled:
+            self.profile = metrics.ProfileCapture(os.path.join(engine.default_cache_dir(), "profiles"))
+            self.profile.start()
+        elif self.profile is not None:
+            paths = self.profile.stop()
+            self.profile = None
+            QMessageBox.information(self, "Profile Saved",
+                                    "Attach these files to the bug report:\n\n" + "\n".join(paths.values()))
 
     def clear_all(self):
+        self.preview_timer.stop()
+        self.preview.cancel()
+        self.thumbnails.cancel()
         self.url = ""
-        self.qr_image = None
+        self.job_id = None
+        self.qr_matrix = None
         self.qr_label.clear()
         self.url_display.clear()
         self.copy_btn.setEnabled(False)
         self.save_btn.setEnabled(False)
+        self.export_set_btn.setEnabled(False)
         self.image_preview.clear()
         self.drop_label.setText("\n\nDrop Image Here\n")
+        # Finished rows can go; rows of a running batch are still being updated
+        if self.batch_done == self.batch_total:
+            self.queue_table.setRowCount(0)
+            self.queue_paths.clear()
+            self.queue_urls.clear()
+            self.queue_matrices.clear()
+            self.queue_job_ids.clear()
+            self.session.forget_finished()
+
+    def closeEvent(self, event):
+        if self.profile is not None:
+            self.profile.stop()
+        self.preview.close()
+        self.thumbnails.close()
+        self.session.close()
+        super().closeEvent(event)
 
     def toggle_dark_mode(self, state):
         if state:
@@ -0,0 +1,406 @@
+# batch.py
+# Headless batch mode: upload many images and write a QR code for each one.
+#
+#   python batch.py photos/ --out qr_out
+#   python batch.py "shots/*.jpg" --upload-workers 8
+#   python batch.py manifest.csv          (CSV with a "path" column)
+import argparse
+import asyncio
+import csv
+import glob
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import core
+import metrics
+from job_queue import FINISHED, JobQueue
+from recompress import FORMATS, RecompressOptions
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp")
+JOURNAL_QUEUE = "batch"
+# Upper bound on codes per render-pool task: bigger chunks save IPC, but a
+# chunk only starts once that many uploads have finished
+RENDER_CHUNK_MAX = 32
+MANIFEST_FIELDS = ["path", "url", "qr_path", "status", "error", "upload_s", "render_s", "total_s",
+                   "bytes_in", "bytes_out"]
+
+
+def collect_images(source):
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, name) for name in sorted(os.listdir(source))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+    elif source.lower().endswith(".csv") and os.path.isfile(source):
+        base = os.path.dirname(source)
+        with open(source, newline="", encoding="utf-8") as f:
+            paths = [
+                os.path.join(base, row["path"]) for row in csv.DictReader(f)
+                if row.get("path")
+            ]
+    else:
+        paths = sorted(glob.glob(source))
+    return [p for p in paths if os.path.isfile(p)]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def qr_output_path(out_dir, image_path):
+    # The source extension stays in the name, so a.jpg and a.png do not
+    # both write a_qr.png: a_jpg_qr.png and a_png_qr.png
+    stem, ext = os.path.splitext(os.path.basename(image_path))
+    if ext:
+        stem += "_" + ext[1:]
+    return os.path.join(out_dir, stem + "_qr.png")
+
+
+def journal_rows(journal, paths, recompress):
+    # -> (done, todo): results for rows a previous run already finished, and
+    # (path, row) pairs still to do. Without a journal everything is to do.
+    if journal is None:
+        return [], [(path, None) for path in paths]
+    done, todo = [], []
+    for path, row in zip(paths, journal.ensure(paths, JOURNAL_QUEUE, recompress)):
+        if row["state"] in FINISHED and row["qr_path"] and os.path.exists(row["qr_path"]):
+            done.append({"path": path, "url": row["url"], "qr_path": row["qr_path"],
+                         "status": "ok", "resumed": True})
+        else:
+            todo.append((path, row))
+    return done, todo
+
+
+def record(journal, row, state, **fields):
+    if journal is not None and row is not None:
+        journal.set_state(row["id"], state, **fields)
+
+
+class BatchRunner:
+    def __init__(self, api_key, out_dir, upload_workers=4, render_workers=None, qr_options=None,
+                 use_cache=True, recompress=None, render_pool=None, journal=None):
+        self.api_key = api_key
+        self.journal = journal
+        self.render_pool = render_pool
+        self.use_cache = use_cache
+        self.recompress = recompress
+        self.out_dir = out_dir
+        self.upload_workers = upload_workers
+        self.render_workers = render_workers or os.cpu_count() or 1
+        self.qr_options = qr_options or {}
+
+    def upload(self, path, row=None):
+        started = time.perf_counter()
+        sizes = {}
+        if row is not None and row["url"]:
+            # Uploaded by an earlier run: go straight to the QR code
+            return row["url"], started, 0.0, sizes
+        record(self.journal, row, "uploading")
+
+        def record_sizes(prepared):
+            sizes["bytes_in"] = prepared.original_bytes
+            sizes["bytes_out"] = len(prepared.data)
+
+        url = core.upload_image_to_imgbb(path, self.api_key, use_cache=self.use_cache,
+                                         recompress=self.recompress, on_prepared=record_sizes)
+        record(self.journal, row, "uploaded", url=url)
+        return url, started, time.perf_counter() - started, sizes
+
+    def render(self, url, qr_path):
+        started = time.perf_counter()
+        img = core.generate_qr_code(url, **self.qr_options)
+        img.save(qr_path)
+        finished = time.perf_counter()
+        return finished - started, finished
+
+    def render_chunk(self, jobs):
+        # jobs: [(url, qr_path)] -> [(render_s, finished)]. With a process
+        # pool the whole chunk is one task (see RenderPool.chunksize)
+        if not self.render_pool:
+            return [self.render(url, qr_path) for url, qr_path in jobs]
+        started = time.perf_counter()
+        pngs = self.render_pool.submit_png_chunk([(url, self.qr_options) for url, _ in jobs]).result()
+        for (_, qr_path), png in zip(jobs, pngs):
+            with open(qr_path, "wb") as f:
+                f.write(png)
+        finished = time.perf_counter()
+        return [(finished - started, finished)] * len(jobs)
+
+    def run(self, paths, on_result=None):
+        os.makedirs(self.out_dir, exist_ok=True)
+        results, todo = journal_rows(self.journal, paths, self.recompress)
+        if on_result:
+            for result in results:
+                on_result(result)
+        with ThreadPoolExecutor(self.upload_workers) as uploads, \
+                ThreadPoolExecutor(self.render_workers) as renders:
+            pending = {uploads.submit(self.upload, path, row): (path, row) for path, row in todo}
+            rendering = {}
+            chunk = []
+            chunk_size = min(RENDER_CHUNK_MAX, self.render_pool.chunksize(len(todo))) if self.render_pool else 1
+            for future in as_completed(pending):
+                path, row = pending[future]
+                try:
+                    url, started, upload_s, sizes = future.result()
+                except Exception as e:
+                    record(self.journal, row, "failed", error=str(e))
+                    result = {"path": path, "status": "error", "error": str(e)}
+                    results.append(result)
+                    if on_result:
+                        on_result(result)
+                    continue
+                chunk.append((path, row, url, qr_output_path(self.out_dir, path), started, upload_s, sizes))
+                if len(chunk) >= chunk_size:
+                    rendering[renders.submit(self.render_chunk, [(e[2], e[3]) for e in chunk])] = chunk
+                    chunk = []
+            if chunk:
+                rendering[renders.submit(self.render_chunk, [(e[2], e[3]) for e in chunk])] = chunk
+
+            for job in as_completed(rendering):
+                try:
+                    timings = job.result()
+                    error = None
+                except Exception as e:
+                    timings = [(None, time.perf_counter())] * len(rendering[job])
+                    error = str(e)
+                for (path, row, url, qr_path, started, upload_s, sizes), (render_s, finished) in zip(
+                        rendering[job], timings):
+                    result = {"path": path, "url": url, "upload_s": round(upload_s, 4), **sizes}
+                    if error is None:
+                        result["render_s"] = round(render_s, 4)
+                        result["qr_path"] = qr_path
+                        result["status"] = "ok"
+                        record(self.journal, row, "rendered", qr_path=qr_path)
+                    else:
+                        result["status"] = "error"
+                        result["error"] = error
+                        record(self.journal, row, "failed", error=error)
+                    result["total_s"] = round(finished - started, 4)
+                    results.append(result)
+                    if on_result:
+                        on_result(result)
+        return results
+
+
+def run_pipeline(api_key, out_dir, paths, upload_workers=4, render_workers=None, qr_options=None,
+                 use_cache=True, recompress=None, render_pool=None, journal=None, on_result=None):
+    from pipeline import Pipeline
+
+    qr_options = dict(qr_options or {})
+    style = {
+        "fill_color": qr_options.pop("fill_color", "black"),
+        "back_color": qr_options.pop("back_color", "white"),
+        "box_size": qr_options.pop("box_size", 10),
+    }
+    limits = {"upload": upload_workers}
+    if render_workers:
+        limits.update(encode=render_workers, rasterize=render_workers)
+    results, todo = journal_rows(journal, paths, recompress)
+    if on_result:
+        for result in results:
+            on_result(result)
+
+    def collect(job):
+        result = {
+            "path": job.tag,
+            "url": job.url,
+            "qr_path": job.out_path,
+            "status": "ok" if job.ok else "error",
+            "error": job.error,
+            "upload_s": round(job.stage_times.get("upload", 0.0), 4),
+            "render_s": round(job.stage_times.get("encode", 0.0) + job.stage_times.get("rasterize", 0.0), 4),
+            "total_s": round(job.total_s, 4),
+        }
+        if job.prepared:
+            result["bytes_in"] = job.prepared.original_bytes
+            result["bytes_out"] = len(job.prepared.data)
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    pipeline = Pipeline(api_key, out_dir=out_dir, recompress=recompress, use_cache=use_cache,
+                        limits=limits, qr_options=qr_options, style=style, render_pool=render_pool,
+                        journal=journal, journal_queue=JOURNAL_QUEUE, on_result=collect)
+
+    async def run():
+        await pipeline.start()
+        try:
+            for path, row in todo:
+                if row is None:
+                    await pipeline.submit(path, tag=path)
+                else:
+                    await pipeline.submit(row["path"], tag=path, job_id=row["id"], url=row["url"])
+            await pipeline.join()
+        finally:
+            await pipeline.close()
+
+    asyncio.run(run())
+    return results
+
+
+def write_manifest(path, results):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({k: result.get(k, "") for k in MANIFEST_FIELDS})
+
+
+def mark_exported(journal, results):
+    # A row is exported once it is in the manifest; reruns then only report it
+    if journal is None:
+        return
+    exported = {os.path.abspath(r["path"]) for r in results if r["status"] == "ok"}
+    for row in journal.jobs(JOURNAL_QUEUE, ["rendered"]):
+        if row["path"] in exported:
+            journal.set_state(row["id"], "exported")
+
+
+def summarize(results, elapsed):
+    ok = [r for r in results if r["status"] == "ok"]
+    # Rows finished by an earlier run have no timings of their own
+    latencies = [r["total_s"] for r in ok if not r.get("resumed")]
+    return {
+        "images": len(results),
+        "ok": len(ok),
+        "resumed": len(ok) - len(latencies),
+        "failed": len(results) - len(ok),
+        "elapsed_s": elapsed,
+        "images_per_s": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "bytes_saved": sum(r.get("bytes_in", 0) - r.get("bytes_out", 0) for r in ok),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Upload images and generate QR codes without a GUI.")
+    parser.add_argument("source", help="directory, glob pattern or CSV manifest with a 'path' column")
+    parser.add_argument("--out", default="qr_output", help="directory for the QR PNGs")
+    parser.add_argument("--manifest", help="results CSV (default: <out>/results.csv)")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                        help="thread pools, or the staged asyncio pipeline")
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--render-backend", choices=["threads", "processes"], default="threads",
+                        help="encode/rasterize QR codes in threads or in a process pool")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="keep-alive HTTP connections (default: --upload-workers)")
+    parser.add_argument("--retries", type=int, default=3, help="retries on 5xx/429 and connect errors")
+    parser.add_argument("--endpoint", help="upload URL (default: $IMGBB_UPLOAD_URL or imgbb)")
+    parser.add_argument("--no-cache", action="store_true", help="always upload, ignoring the upload cache")
+    parser.add_argument("--journal", help="job journal for resuming (default: <out>/jobs.sqlite3)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="forget what earlier runs into --out recorded and start over")
+    parser.add_argument("--shrink", action="store_true", help="downscale and re-encode images before upload")
+    parser.add_argument("--max-dimension", type=int, default=2048)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="JPEG")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--metrics", help="write per-span timings here (.json, else Prometheus text)")
+    parser.add_argument("--profile", metavar="DIR", help="capture cProfile/tracemalloc/stack samples into DIR")
+    parser.add_argument("--error-correction", choices=sorted(core.ERROR_CORRECTION), default="M")
+    parser.add_argument("--fill-color", default="black")
+    parser.add_argument("--back-color", default="white")
+    parser.add_argument("--box-size", type=int, default=10)
+    parser.add_argument("--border", type=int, default=4)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    api_key = core.load_api_key()
+    if not api_key:
+        print("❌ IMGBB_API_KEY not found in .env")
+        return 1
+
+    paths = collect_images(args.source)
+    if not paths:
+        print(f"❌ No images found in {args.source}")
+        return 1
+
+    core.configure_uploader(
+        endpoint=args.endpoint,
+        pool_size=args.pool_size or args.upload_workers,
+        retries=args.retries,
+    )
+
+    os.makedirs(args.out, exist_ok=True)
+    journal = JobQueue(args.journal or os.path.join(args.out, "jobs.sqlite3"))
+    if args.no_resume:
+        journal.clear(JOURNAL_QUEUE)
+
+    options = {
+        "journal": journal,
+        "upload_workers": args.upload_workers,
+        "render_workers": args.render_workers,
+        "use_cache": not args.no_cache,
+        "recompress": RecompressOptions(args.max_dimension, args.format, args.quality) if args.shrink else None,
+        "qr_options": {
+            "fill_color": args.fill_color,
+            "back_color": args.back_color,
+            "error_correction": core.ERROR_CORRECTION[args.error_correction],
+            "box_size": args.box_size,
+            "border": args.border,
+        },
+    }
+
+    def report(result):
+        mark = "✅" if result["status"] == "ok" else "❌"
+        if result.get("resumed"):
+            mark = "↩️"
+        print(f"{mark} {result['path']} {result.get('url') or result.get('error', '')}")
+
+    render_pool = None
+    if args.render_backend == "processes":
+        from render_pool import RenderPool
+        render_pool = RenderPool(args.render_workers)
+        options["render_pool"] = render_pool
+
+    profile = metrics.ProfileCapture(args.profile) if args.profile else None
+    if profile:
+        profile.start()
+    started = time.perf_counter()
+    try:
+        if args.engine == "asyncio":
+            results = run_pipeline(api_key, args.out, paths, on_result=report, **options)
+        else:
+            results = BatchRunner(api_key, args.out, **options).run(paths, on_result=report)
+    finally:
+        if render_pool:
+            render_pool.close()
+    elapsed = time.perf_counter() - started
+    if profile:
+        print("profile: " + ", ".join(profile.stop().values()))
+    if args.metrics:
+        metrics.export(args.metrics)
+
+    write_manifest(args.manifest or os.path.join(args.out, "results.csv"), results)
+    mark_exported(journal, results)
+    journal.close()
+
+    stats = summarize(results, elapsed)
+    print(f"\n{stats['ok']}/{stats['images']} images in {stats['elapsed_s']:.2f}s "
+          f"({stats['images_per_s']:.2f} images/s), "
+          f"p50 {stats['p50_s'] * 1000:.0f} ms, p95 {stats['p95_s'] * 1000:.0f} ms")
+    if stats["resumed"]:
+        print(f"resume: {stats['resumed']} finished by an earlier run, not redone")
+    if args.shrink:
+        print(f"shrink: {stats['bytes_saved'] / 1024 / 1024:.1f} MB not uploaded")
+    network = core.get_uploader().timing_summary()
+    if network:
+        print(f"network: {network['requests']} uploads, {network['new_connections']} new connections, "
+              f"handshake {network['mean_connect_s'] * 1000:.0f} ms avg, "
+              f"transfer {network['mean_transfer_s'] * 1000:.0f} ms avg, {network['retries']} retries")
+    return 0 if stats["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# benchmarks/bench_encoder.py
+# fast_qr against qrcode: first a differential check (every version 1-40 at
+# every error correction level, fitted and forced versions, borders,
+# numeric/alphanumeric/byte/mixed payloads, overflow errors), then encode
+# time per version for both. Exits 1 on the first mismatch.
+#
+#   python benchmarks/bench_encoder.py [--seed 1] [--rounds 3] [--repeat 5]
+#   python benchmarks/bench_encoder.py --check-only
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import core
+import fast_qr
+from qrcode import util
+
+LEVELS = {"L": core.ERROR_CORRECT_L, "M": core.ERROR_CORRECT_M,
+          "Q": core.ERROR_CORRECT_Q, "H": core.ERROR_CORRECT_H}
+ALPHABETS = {
+    "numeric": string.digits,
+    "alnum": string.digits + string.ascii_uppercase + " $%*+-./:",
+    "bytes": string.printable,
+    "mixed": None,
+}
+
+
+def payload(rng, alphabet, length):
+    if alphabet is None:
+        # runs of different modes, so optimal_data_chunks splits segments
+        parts = []
+        while sum(map(len, parts)) < length:
+            chars = rng.choice((string.digits, string.ascii_uppercase, "héllo wörld/?&"))
+            parts.append("".join(rng.choice(chars) for _ in range(rng.randint(1, 40))))
+        return "".join(parts)[:length]
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def byte_capacity(version, ec):
+    # characters of 8-bit data that fit `version` (mode and length headers off)
+    header = 4 + (8 if version < 10 else 16)
+    return (util.BIT_LIMIT_TABLE[ec][version] - header) // 8
+
+
+def sized_for(rng, version, ec):
+    # byte payload that needs exactly `version` when fitted
+    low = byte_capacity(version - 1, ec) + 1 if version > 1 else 1
+    return payload(rng, ALPHABETS["bytes"], rng.randint(low, max(low, byte_capacity(version, ec))))
+
+
+def outcome(encoder, *args):
+    try:
+        return encoder(*args)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def cases(rng, rounds):
+    for ec in LEVELS.values():
+        for version in range(1, 41):
+            for _ in range(rounds):
+                data = sized_for(rng, version, ec)
+                border = rng.choice((0, 1, 4))
+                yield data, ec, border, None
+                yield data, ec, border, version
+            # short data in a forced, much larger version
+            yield payload(rng, ALPHABETS["mixed"], 12), ec, 4, version
+        for name, alphabet in ALPHABETS.items():
+            for _ in range(rounds * 10):
+                yield payload(rng, alphabet, rng.randint(1, 1200)), ec, 4, None
+        # overflow, both fitted and forced
+        yield "x" * 3000, ec, 4, None
+        yield "x" * 400, ec, 4, 5
+
+
+def check(seed, rounds):
+    rng = random.Random(seed)
+    total = 0
+    started = time.perf_counter()
+    for data, ec, border, version in cases(rng, rounds):
+        total += 1
+        expected = outcome(core.qrcode_matrix, data, ec, border, version)
+        got = outcome(fast_qr.encode, data, ec, border, version)
+        if got != expected:
+            print(f"MISMATCH: {len(data)} chars {data[:40]!r}... ec={ec} border={border} version={version}")
+            print(f"  qrcode:  {expected if isinstance(expected, str) else f'{len(expected)} rows'}")
+            print(f"  fast_qr: {got if isinstance(got, str) else f'{len(got)} rows'}")
+            return False
+    print(f"differential: {total} cases identical ({time.perf_counter() - started:.1f}s)")
+    return True
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(seed, repeat):
+    rng = random.Random(seed)
+    ec = core.ERROR_CORRECT_M
+    print(f"\n{'version':>7}  {'chars':>5}  {'qrcode ms':>10}  {'fast_qr ms':>10}  {'speedup':>7}")
+    total_ref = total_fast = 0.0
+    for version in range(1, 41):
+        data = sized_for(rng, version, ec)
+        fast_qr.encode(data, ec)  # build the per-version layout once
+        ref = best_time(lambda: core.qrcode_matrix(data, ec), repeat)
+        fast = best_time(lambda: fast_qr.encode(data, ec), repeat)
+        total_ref += ref
+        total_fast += fast
+        if version in (1, 2, 5, 10, 15, 20, 25, 30, 35, 40):
+            print(f"{version:>7}  {len(data):>5}  {ref * 1000:>10.2f}  {fast * 1000:>10.2f}  {ref / fast:>6.1f}x")
+    print(f"{'all 40':>7}  {'':>5}  {total_ref * 1000:>10.1f}  {total_fast * 1000:>10.1f}  "
+          f"{total_ref / total_fast:>6.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and time fast_qr against qrcode.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3, help="random payloads per version and level")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per version (best is kept)")
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not check(args.seed, args.rounds):
+        sys.exit(1)
+    if not args.check_only:
+        bench(args.seed, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_render.py
+# Compare the old preview path (make_image -> PNG -> decode -> LANCZOS resize)
+# with rasterizing the module matrix directly.
+#
+#   python benchmarks/bench_render.py [--repeat 200]
+import argparse
+import io
+import os
+import sys
+import timeit
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import core
+
+SAMPLES = {
+    "short url": "https://i.ibb.co/abc123/photo.jpg",
+    "long text": "https://example.com/?q=" + "x" * 600,
+}
+SIZES = (150, 200, 400)
+
+
+def old_path(qr, size, color):
+    img = qr.make_image(fill_color=color, back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    buffer.seek(0)
+    return Image.open(buffer).resize((size, size), Image.Resampling.LANCZOS)
+
+
+def new_path(matrix, size, color):
+    return core.render_matrix(matrix, size, color, "white")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'sample':<10} {'size':>5} {'old ms':>9} {'new ms':>9} {'speedup':>8}")
+    for name, data in SAMPLES.items():
+        qr = core.build_qr(data)
+        matrix = qr.get_matrix()
+        for size in SIZES:
+            old = timeit.timeit(lambda: old_path(qr, size, "#3355aa"), number=args.repeat)
+            new = timeit.timeit(lambda: new_path(matrix, size, "#3355aa"), number=args.repeat)
+            old_ms = old / args.repeat * 1000
+            new_ms = new / args.repeat * 1000
+            print(f"{name:<10} {size:>5} {old_ms:>9.3f} {new_ms:>9.3f} {old_ms / new_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/bench_render_pool.py
+# Scaling of the process-pool renderer against a single in-process loop.
+#
+#   python benchmarks/bench_render_pool.py [--count 2000] [--workers 1 2 4 8]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from render_pool import RenderPool, render_png
+
+
+def make_jobs(count):
+    options = {"box_size": 10, "border": 4, "fill_color": "black", "back_color": "white"}
+    return [(f"https://i.ibb.co/{i:08x}/image-{i}.jpg", options) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args(argv)
+    jobs = make_jobs(args.count)
+
+    started = time.perf_counter()
+    for job in jobs:
+        render_png(job)
+    baseline = time.perf_counter() - started
+    print(f"{'in-process':<12} {args.count / baseline:>9.0f} codes/s   1.00x")
+
+    for workers in args.workers:
+        with RenderPool(workers) as pool:
+            # Warm the workers so process start-up is not counted
+            list(pool.map_png(jobs[:workers]))
+            started = time.perf_counter()
+            for _ in pool.map_png(jobs):
+                pass
+            elapsed = time.perf_counter() - started
+        print(f"{workers:>2} workers   {args.count / elapsed:>9.0f} codes/s {baseline / elapsed:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_server.py
+# Load test for server.py: keep-alive connections hammering GET /qr.
+# Starts its own server unless --url points at a running one. Clients run
+# in separate processes so the load generator is not sharing the
+# server's GIL.
+#
+#   python benchmarks/bench_server.py --connections 64 --duration 10 --keys 1
+#   python benchmarks/bench_server.py --keys 10000 --revalidate 0.5
+#   python benchmarks/bench_server.py --url http://qr.internal:8080 --processes 4
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch import percentile  # noqa: E402
+from bench_upload import free_port, wait_for_port  # noqa: E402
+
+
+async def connection(host, port, paths, etags, deadline, revalidate, seed, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = seed
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 7919
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if path in etags and (i % 1000) / 1000 < revalidate:
+                request += f"If-None-Match: {etags[path]}\r\n"
+            started = time.perf_counter()
+            writer.write((request + "\r\n").encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            status = int(lines[0].split()[1])
+            headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+            await reader.readexactly(int(headers.get("Content-Length", 0)))
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if "ETag" in headers:
+                etags[path] = headers["ETag"]
+    finally:
+        writer.close()
+
+
+def client(url, paths, connections, duration, revalidate, offset, queue):
+    split = urlsplit(url)
+    latencies = []
+    statuses = {}
+    etags = {}
+
+    async def run():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            connection(split.hostname, split.port, paths, etags, deadline, revalidate,
+                       offset + n * 104729, latencies, statuses)
+            for n in range(connections)
+        ))
+
+    asyncio.run(run())
+    queue.put((latencies, statuses))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the QR HTTP server.")
+    parser.add_argument("--url", help="running server; by default one is started")
+    parser.add_argument("--connections", type=int, default=64, help="keep-alive connections in total")
+    parser.add_argument("--processes", type=int, default=2, help="client processes")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--keys", type=int, default=100, help="distinct codes requested (1 = one hot code)")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--format", default="png", choices=("png", "svg", "pdf"))
+    parser.add_argument("--revalidate", type=float, default=0.0,
+                        help="fraction of repeat requests sent with If-None-Match")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--port", str(port)],
+                                  stdout=subprocess.DEVNULL)
+        wait_for_port(port)
+        url = f"http://127.0.0.1:{port}"
+
+    paths = ["/qr?" + urlencode({"data": f"https://example.com/item/{i}", "size": args.size,
+                                 "format": args.format})
+             for i in range(args.keys)]
+    per_process = max(1, args.connections // args.processes)
+    queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=client, args=(url, paths, per_process, args.duration,
+                                                     args.revalidate, n * 31, queue))
+        for n in range(args.processes)
+    ]
+    try:
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        latencies = []
+        statuses = {}
+        for _ in workers:
+            worker_latencies, worker_statuses = queue.get()
+            latencies += worker_latencies
+            for status, count in worker_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result = {
+        "requests": len(latencies),
+        "requests_per_s": len(latencies) / args.duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "statuses": statuses,
+        "wall_s": elapsed,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['requests']} requests in {args.duration:.0f}s over {per_process * args.processes} "
+          f"connections, {args.keys} distinct codes")
+    print(f"  {result['requests_per_s']:.0f} req/s   p50 {result['p50_ms']:.2f} ms   "
+          f"p95 {result['p95_ms']:.2f} ms   p99 {result['p99_ms']:.2f} ms   max {result['max_ms']:.1f} ms")
+    print("  statuses: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
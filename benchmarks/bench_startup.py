@@ -0,0 +1,121 @@
+# benchmarks/bench_startup.py
+# Cold-start cost of the two GUIs: import time from `python -X importtime`
+# (total and the heaviest modules) and time from process spawn to the first
+# event-loop turn after the window is shown. Every run is a fresh process.
+#
+#   python benchmarks/bench_startup.py --runs 5 --max-import-ms 150
+# Exits 1 when the median import time of any app exceeds --max-import-ms,
+# so it can sit in CI as a regression check.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+APPS = {"qt": "V2main", "tk": "main"}
+
+# Run in the child: build the window, show it, report the wall clock from
+# the first event-loop turn afterwards, then quit.
+FIRST_PAINT = {
+    "qt": """
+import sys, time
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+app = QApplication(sys.argv)
+import V2main
+win = V2main.QRCodeApp()
+win.show()
+QTimer.singleShot(0, lambda: (print(time.time()), app.quit()))
+app.exec_()
+""",
+    "tk": """
+import time, tkinter as tk
+root = tk.Tk()
+import main
+app = main.QRCodeGenerator(root)
+root.after(0, lambda: (root.update_idletasks(), print(time.time()), root.destroy()))
+root.mainloop()
+""",
+}
+
+
+def child_env():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # The GUIs must start without a key; it is only needed on first upload
+    env.pop("IMGBB_API_KEY", None)
+    if "QT_QPA_PLATFORM" not in env and not env.get("DISPLAY"):
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    return env
+
+
+def import_profile(module):
+    # -> (total_us, {module: cumulative_us}) parsed from -X importtime
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=child_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    # Children are listed before their parent, so the app's own imports are
+    # the lines after the previous top-level entry (site, encodings, ...)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue
+        if not name.startswith("  "):   # top level
+            if name.strip() == module:
+                return int(cum), cumulative
+            cumulative = {}
+            continue
+        cumulative[name.strip()] = int(cum)
+    return 0, cumulative
+
+
+def first_paint_ms(app):
+    started = time.time()
+    result = subprocess.run([sys.executable, "-c", FIRST_PAINT[app]], cwd=ROOT, env=child_env(),
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        return None
+    return (float(result.stdout.strip().splitlines()[-1]) - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure GUI import time and time-to-first-paint.")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import exceeds this")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for app in args.apps:
+        module = APPS[app]
+        try:
+            runs = [import_profile(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{app}: cannot import {module}: {e}")
+            continue
+        import_ms = statistics.median(total for total, _ in runs) / 1000
+        paints = [first_paint_ms(app) for _ in range(args.runs)]
+        paints = [p for p in paints if p is not None]
+        paint = f"{statistics.median(paints):.0f} ms" if paints else "n/a (no display)"
+
+        print(f"{app} ({module}.py): import {import_ms:.1f} ms, first paint {paint}")
+        heaviest = sorted(runs[-1][1].items(), key=lambda item: item[1], reverse=True)
+        for name, cum in [item for item in heaviest if item[0] != module][:args.top]:
+            print(f"    {cum / 1000:8.1f} ms  {name}")
+
+        if args.max_import_ms is not None and import_ms > args.max_import_ms:
+            print(f"    regression: {import_ms:.1f} ms > {args.max_import_ms:.1f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
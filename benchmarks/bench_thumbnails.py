@@ -0,0 +1,77 @@
+# benchmarks/bench_thumbnails.py
+# Full decode + scale (what QPixmap(path).scaled() did on the GUI thread)
+# against thumbnails.load_thumbnail, on generated large JPEG and PNG
+# photos. Reports time and the peak RSS of a fresh process doing one load.
+#
+#   python benchmarks/bench_thumbnails.py [--megapixels 50] [--repeat 3]
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import thumbnails
+
+BOX = (200, 200)
+
+
+def make_photo(path, megapixels):
+    # Smooth gradients plus noise, so the encoders have photo-like work
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    small = Image.effect_noise((width // 16, height // 16), 64).convert("RGB")
+    image = small.resize((width, height), Image.Resampling.BILINEAR)
+    image.save(path, quality=90) if path.endswith(".jpg") else image.save(path, compress_level=1)
+    return width, height
+
+
+def full_decode(path, box):
+    with Image.open(path) as image:
+        image.load()
+        return image.convert("RGB").resize(box, Image.Resampling.BILINEAR)
+
+
+def peak_rss(func, path, queue):
+    # ru_maxrss is in KiB on Linux
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func(path, BOX)
+    queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 1024)
+
+
+def measure(func, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(path, BOX)
+        best = min(best, time.perf_counter() - started)
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=peak_rss, args=(func, path, queue))
+    process.start()
+    peak = queue.get()
+    process.join()
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time full-size against reduced-scale thumbnail decoding.")
+    parser.add_argument("--megapixels", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in (".jpg", ".png"):
+            path = os.path.join(tmp, "photo" + extension)
+            width, height = make_photo(path, args.megapixels)
+            print(f"{extension[1:]}  {width}x{height}  {os.path.getsize(path) / 1e6:.1f} MB on disk")
+            for name, func in (("full decode", full_decode), ("thumbnail", thumbnails.load_thumbnail)):
+                best, peak = measure(func, path, args.repeat)
+                print(f"  {name:<12} {best * 1000:>8.1f} ms   +{peak / 1e6:>6.1f} MB peak RSS")
+
+
+if __name__ == "__main__":
+    main()
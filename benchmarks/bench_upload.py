@@ -0,0 +1,134 @@
+# benchmarks/bench_upload.py
+# End-to-end upload + QR benchmark against the local imgbb stub.
+# Each (concurrency, file size) cell runs in its own process so peak RSS
+# is per configuration.
+#
+#   python benchmarks/bench_upload.py --concurrency 1 4 16 --sizes 64K 1M 4M --latency 0.05
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_size(text):
+    units = {"K": 1024, "M": 1024 * 1024}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"stub did not start on port {port}")
+
+
+def run_cell(args):
+    import batch
+    import core
+
+    core.configure_uploader(endpoint=args.endpoint, pool_size=args.concurrency, backoff_factor=0.05)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"img_{i:04d}.jpg")
+            with open(path, "wb") as f:
+                f.write(os.urandom(args.size))
+            paths.append(path)
+
+        runner = batch.BatchRunner("bench", os.path.join(tmp, "out"),
+                                   upload_workers=args.concurrency, use_cache=False)
+        started = time.perf_counter()
+        results = runner.run(paths)
+        elapsed = time.perf_counter() - started
+
+    latencies = [r["total_s"] for r in results if r["status"] == "ok"]
+    print(json.dumps({
+        "ok": len(latencies),
+        "failed": len(results) - len(latencies),
+        "images_per_s": len(latencies) / elapsed,
+        "mb_per_s": len(latencies) * args.size / elapsed / 1024 / 1024,
+        "p50_ms": batch.percentile(latencies, 50) * 1000,
+        "p95_ms": batch.percentile(latencies, 95) * 1000,
+        "p99_ms": batch.percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sizes", nargs="+", default=["64K", "1M", "4M"])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=0)
+    # internal: run one cell and print JSON
+    parser.add_argument("--cell", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--endpoint", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cell:
+        args.concurrency = args.concurrency[0]
+        run_cell(args)
+        return
+
+    port = free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "imgbb_stub.py"), "--port", str(port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate), "--bandwidth", str(args.bandwidth),
+    ], stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        endpoint = f"http://127.0.0.1:{port}/1/upload"
+        print(f"{'size':>6} {'conc':>5} {'img/s':>8} {'MB/s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'RSS MB':>7} {'failed':>6}")
+        for size in args.sizes:
+            for concurrency in args.concurrency:
+                output = subprocess.check_output([
+                    sys.executable, os.path.abspath(__file__), "--cell",
+                    "--endpoint", endpoint, "--size", str(parse_size(size)),
+                    "--files", str(args.files), "--concurrency", str(concurrency),
+                ])
+                r = json.loads(output.decode().strip().splitlines()[-1])
+                rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+                print(f"{size:>6} {concurrency:>5} {r['images_per_s']:>8.1f} {r['mb_per_s']:>7.1f} "
+                      f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f} {rss:>7} {r['failed']:>6}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
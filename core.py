@@ -0,0 +1,211 @@
+# core.py
+# Upload + QR building shared by the Tk app, the Qt app and headless tools.
+# Nothing in here may import tkinter or PyQt5.
+#
+# qrcode, PIL, requests and dotenv are imported on first use so that the
+# GUIs can put a window up before paying for them (see warm_up).
+#
+# Matrices come from fast_qr when NumPy is installed (same modules as
+# qrcode, a fraction of the CPU); QR_ENCODER=qrcode or
+# configure_encoder("qrcode") goes back to the reference encoder.
+import os
+import threading
+
+import metrics
+from matrix_cache import MatrixCache
+
+# Same values as qrcode.constants.ERROR_CORRECT_*
+ERROR_CORRECT_L = 1
+ERROR_CORRECT_M = 0
+ERROR_CORRECT_Q = 3
+ERROR_CORRECT_H = 2
+
+ERROR_CORRECTION = {
+    "L": ERROR_CORRECT_L,
+    "M": ERROR_CORRECT_M,
+    "Q": ERROR_CORRECT_Q,
+    "H": ERROR_CORRECT_H,
+}
+
+
+class ConfigError(Exception):
+    pass
+
+
+def load_api_key():
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("IMGBB_API_KEY")
+
+
+def require_api_key():
+    api_key = load_api_key()
+    if not api_key:
+        raise ConfigError("IMGBB_API_KEY not found in .env")
+    return api_key
+
+
+def warm_up():
+    # Pay the import and .env costs in the background once the window is up
+    import qrcode  # noqa: F401
+    from PIL import Image, ImageColor  # noqa: F401
+    get_encoder()
+    get_uploader()
+    load_api_key()
+
+
+_upload_cache = None
+_upload_cache_lock = threading.Lock()
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def configure_uploader(**options):
+    # Replace the shared uploader, e.g. configure_uploader(pool_size=16)
+    global _uploader
+    with _uploader_lock:
+        if _uploader is not None:
+            _uploader.close()
+        from uploader import ImgbbUploader
+        _uploader = ImgbbUploader(**options)
+        return _uploader
+
+
+def get_uploader():
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            from uploader import ImgbbUploader
+            _uploader = ImgbbUploader()
+        return _uploader
+
+
+def get_upload_cache():
+    global _upload_cache
+    with _upload_cache_lock:
+        if _upload_cache is None:
+            from upload_cache import UploadCache
+            _upload_cache = UploadCache()
+        return _upload_cache
+
+
+def upload_cache_key(digest, api_key, recompress=None):
+    # Cache key for content `digest` uploaded to the configured endpoint
+    from upload_cache import cache_key
+    return cache_key(digest, get_uploader().endpoint, api_key, recompress)
+
+
+def upload_image_to_imgbb(image_path, api_key, use_cache=True, recompress=None, on_prepared=None,
+                          on_progress=None):
+    # Same bytes -> same URL: check the content-addressed cache first
+    if use_cache:
+        from upload_cache import file_digest
+        cache = get_upload_cache()
+        with metrics.span("read"):
+            digest = upload_cache_key(file_digest(image_path), api_key, recompress)
+        url = cache.get(digest)
+        if url:
+            return url
+
+    if recompress:
+        from recompress import prepare_for_upload
+        prepared = prepare_for_upload(image_path, recompress)
+        if on_prepared:
+            on_prepared(prepared)
+        url = get_uploader().upload_bytes(prepared.data, prepared.filename, api_key, on_progress)
+    else:
+        url = get_uploader().upload(image_path, api_key, on_progress)
+
+    if use_cache:
+        cache.put(digest, url)
+    return url
+
+
+def build_qr(data, error_correction=ERROR_CORRECT_M, box_size=10, border=4, version=None):
+    import qrcode
+    qr = qrcode.QRCode(
+        version=version or 1,
+        error_correction=error_correction,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=version is None)
+    return qr
+
+
+def qrcode_matrix(data, error_correction=ERROR_CORRECT_M, border=4, version=None):
+    # The reference encoder: qrcode's own make() and get_matrix()
+    qr = build_qr(data, error_correction, border=border, version=version)
+    return tuple(bytes(row) for row in qr.get_matrix())
+
+
+ENCODERS = ("auto", "fast", "qrcode")
+_encoder = None
+
+
+def configure_encoder(name=None):
+    # "fast" needs NumPy, "qrcode" is the reference, "auto" (the default,
+    # or $QR_ENCODER) is fast when NumPy can be imported and the installed
+    # qrcode is a release fast_qr was checked against
+    global _encoder
+    name = name or os.getenv("QR_ENCODER") or "auto"
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown QR encoder {name!r}, expected one of {ENCODERS}")
+    encoder = qrcode_matrix
+    if name != "qrcode":
+        try:
+            import fast_qr
+            if name == "fast" or fast_qr.supported():
+                encoder = fast_qr.encode
+        except ImportError:  # optional: NumPy not installed
+            if name == "fast":
+                raise
+    _encoder = encoder
+    return encoder
+
+
+def get_encoder():
+    return _encoder or configure_encoder()
+
+
+_matrix_cache = MatrixCache()
+
+
+def get_matrix_cache():
+    return _matrix_cache
+
+
+def encode_matrix(data, error_correction=ERROR_CORRECT_M, border=4, version=None,
+                  box_size=None, use_cache=True):
+    # box_size is accepted (and ignored) so QR option dicts can be passed as-is;
+    # it only matters when rasterizing.
+    key = (data, error_correction, version, border)
+    if use_cache:
+        matrix = _matrix_cache.get(key)
+        if matrix is not None:
+            return matrix
+    with metrics.span("qr_make"):
+        matrix = get_encoder()(data, error_correction, border, version)
+    if use_cache:
+        _matrix_cache.put(key, matrix)
+    return matrix
+
+
+def generate_qr_code(data, fill_color="black", back_color="white",
+                     error_correction=ERROR_CORRECT_M, box_size=10, border=4):
+    # Same pixels as qr.make_image(), rasterized from the (cached) matrix
+    matrix = encode_matrix(data, error_correction, border)
+    return render_matrix(matrix, len(matrix) * box_size, fill_color, back_color)
+
+
+def render_matrix(matrix, size, fill_color="black", back_color="white"):
+    # Paint the module matrix straight into a palette image at display size:
+    # one byte per module, scaled with NEAREST, no PNG round-trip.
+    from PIL import Image, ImageColor
+    with metrics.span("rasterize"):
+        modules = len(matrix)
+        data = b"".join(bytes(row) for row in matrix)
+        img = Image.frombytes("P", (modules, modules), data)
+        img.putpalette(ImageColor.getrgb(back_color) + ImageColor.getrgb(fill_color))
+        return img.resize((size, size), Image.Resampling.NEAREST)
@@ -0,0 +1,260 @@
+# engine.py
+# The GUI-free engine behind the Tk app, the Qt app and anything that wants
+# "image -> hosted URL -> QR code" inside its own process. Frontends talk to
+# this module only; core, pipeline, render_pool, export, job_queue and
+# friends are its implementation and may change underneath it.
+#
+#   import engine
+#   matrix = engine.encode("https://example.com")              # tuple of bytes rows
+#   png = engine.render(matrix, size=600)                      # bytes
+#   svg = engine.render(matrix, format="svg", size="50mm")
+#   url = engine.upload("photo.jpg")                           # key from $IMGBB_API_KEY / .env
+#   for result in engine.upload_many(paths, workers=8): ...
+#
+# Options are plain dicts:
+#   QR options:  error_correction ("L"/"M"/"Q"/"H" or core.ERROR_CORRECT_*), border, version
+#   style:       fill_color, back_color, box_size
+# Anything left out falls back to DEFAULT_QR_OPTIONS / DEFAULT_STYLE, which
+# both GUIs share.
+#
+# Encoding is cached (core's matrix LRU), uploads share one pooled session
+# and the content-addressed upload cache, and the *_many variants fan out
+# over threads or processes; all of that is built once, here.
+import functools
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import core
+import export
+import sheets
+from core import ConfigError, require_api_key, warm_up  # noqa: F401
+from export import CSS_DPI, parse_size  # noqa: F401
+from job_queue import FINISHED, JobQueue, options_from_json
+from multipart import ThroughputMeter, format_rate  # noqa: F401
+from preview import PreviewRenderer  # noqa: F401
+from recompress import RecompressOptions  # noqa: F401
+from sheets import LabelTemplate  # noqa: F401
+from thumbnails import ThumbnailLoader  # noqa: F401
+from upload_cache import default_cache_dir  # noqa: F401
+
+DEFAULT_QR_OPTIONS = {"error_correction": core.ERROR_CORRECT_M, "border": 4, "version": None}
+DEFAULT_STYLE = {"fill_color": "black", "back_color": "white", "box_size": 10}
+EXPORT_FORMATS = export.FORMATS
+DEFAULT_EXPORT_SET = export.DEFAULT_EXPORT_SET
+
+
+def qr_options(options=None):
+    # Full encode_matrix keyword arguments; error correction may be given as a letter
+    merged = dict(DEFAULT_QR_OPTIONS, **(options or {}))
+    ec = merged["error_correction"]
+    if isinstance(ec, str):
+        merged["error_correction"] = core.ERROR_CORRECTION[ec.upper()]
+    return {k: merged[k] for k in DEFAULT_QR_OPTIONS}
+
+
+def style_options(style=None):
+    return dict(DEFAULT_STYLE, **(style or {}))
+
+
+# -- encode / render --------------------------------------------------------
+
+def encode(data, options=None):
+    # -> module matrix: a tuple of bytes rows, 1 = dark, quiet zone included.
+    # ValueError when the data does not fit any QR version.
+    from qrcode.exceptions import DataOverflowError
+    try:
+        return core.encode_matrix(data, **qr_options(options))
+    except (DataOverflowError, ValueError) as e:
+        # Fitting past version 40 surfaces as qrcode's "Invalid version (was 41...)"
+        if isinstance(e, DataOverflowError) or str(e).startswith("Invalid version"):
+            raise ValueError(f"{len(data)} characters do not fit in a QR code at these settings") from None
+        raise
+
+
+def render_image(matrix, size=None, style=None):
+    # -> PIL palette image, size pixels square (default: box_size per module)
+    style = style_options(style)
+    size = size or len(matrix) * style["box_size"]
+    return core.render_matrix(matrix, size, style["fill_color"], style["back_color"])
+
+
+def render(matrix, style=None, size=None, format="png", dpi=None):
+    # -> file bytes in `format` (png, svg or pdf). size is pixels or a
+    # "50mm" / "2in" style string; PNG is streamed 1-bit, SVG/PDF are vectors
+    style = style_options(style)
+    if size is None:
+        size = len(matrix) * style["box_size"]
+    buffer = io.BytesIO()
+    export.export_matrix(matrix, buffer, format, size, dpi, style["fill_color"], style["back_color"])
+    return buffer.getvalue()
+
+
+def save(matrix, path, style=None, size=None, dpi=None):
+    # Writes by extension: png/svg/pdf via the exporters, anything else
+    # Pillow can write (jpg, bmp, ...) through a raster
+    style = style_options(style)
+    if os.path.splitext(path)[1].lower().lstrip(".") in EXPORT_FORMATS:
+        return export.export_matrix(matrix, path, size=size or len(matrix) * style["box_size"], dpi=dpi,
+                                    fill_color=style["fill_color"], back_color=style["back_color"])
+    render_image(matrix, size, style).convert("RGB").save(path)
+    return path
+
+
+def export_set(matrix, base_path, variants=None, style=None):
+    # One file per "format[:size][@dpi]" variant, all from the same matrix
+    style = style_options(style)
+    return export.export_set(matrix, base_path, variants or DEFAULT_EXPORT_SET,
+                             style["fill_color"], style["back_color"])
+
+
+def encode_many(items, options=None, processes=None):
+    # -> iterator of matrices, in input order. processes > 1 encodes in a
+    # process pool (qr.make holds the GIL)
+    options = qr_options(options)
+    if not processes or processes <= 1:
+        return (core.encode_matrix(data, **options) for data in items)
+    return _pooled(processes, lambda pool: pool.map_matrices((data, options) for data in items))
+
+
+def render_many(matrices, style=None, size=None, format="png", processes=None):
+    # -> iterator of file bytes, in input order
+    func = functools.partial(render, style=style, size=size, format=format)
+    if not processes or processes <= 1:
+        return map(func, matrices)
+    matrices = list(matrices)
+    return _pooled(processes, lambda pool: pool.executor.map(
+        func, matrices, chunksize=pool.chunksize(len(matrices))))
+
+
+def print_sheets(items, path, template=None, style=None, options=None, processes=None, on_page=None):
+    # Label sheets: data strings or (data, caption) pairs tiled onto pages of
+    # a LabelTemplate grid -> [path] for PDF, one file per page for PNG.
+    # Items may be a generator; pages are composed one at a time.
+    return sheets.compose(items, path, template, style=style_options(style), qr_options=qr_options(options),
+                          processes=processes, on_page=on_page)
+
+
+def _pooled(processes, start):
+    from render_pool import RenderPool
+    with RenderPool(processes) as pool:
+        yield from start(pool)
+
+
+# -- upload -----------------------------------------------------------------
+
+def upload(path, api_key=None, recompress=None, use_cache=True, on_progress=None):
+    # -> hosted URL. Same bytes (and recompress options) -> cached URL, no request
+    return core.upload_image_to_imgbb(path, api_key or require_api_key(), use_cache=use_cache,
+                                      recompress=recompress, on_progress=on_progress)
+
+
+def upload_bytes(data, filename, api_key=None, use_cache=True):
+    # upload() for bytes already in memory; shares the upload cache, which
+    # is keyed by the same sha256 file_digest computes
+    api_key = api_key or require_api_key()
+    digest = core.upload_cache_key(hashlib.sha256(data).hexdigest(), api_key)
+    cache = core.get_upload_cache() if use_cache else None
+    url = cache.get(digest) if cache else None
+    if url:
+        return url
+    url = core.get_uploader().upload_bytes(data, filename, api_key)
+    if cache:
+        cache.put(digest, url)
+    return url
+
+
+def upload_many(paths, api_key=None, workers=4, recompress=None, use_cache=True):
+    # -> iterator of {"path", "url", "error"} dicts in completion order;
+    # a failed upload is reported, not raised
+    api_key = api_key or require_api_key()
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(upload, path, api_key, recompress, use_cache): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield {"path": futures[future], "url": future.result(), "error": None}
+            except Exception as e:
+                yield {"path": futures[future], "url": None, "error": str(e)}
+
+
+def configure_uploader(**options):
+    # endpoint, pool_size, retries, timeouts; see uploader.ImgbbUploader
+    core.configure_uploader(**options)
+
+
+def upload_throughput():
+    # Recent upload speed in bytes/s, None until something was sent
+    return core.get_uploader().throughput()
+
+
+class UploadSession:
+    # One long-lived upload -> QR pipeline plus its job journal, as the
+    # desktop apps use it: submit paths as they are picked or dropped, get
+    # callbacks per stage, resume what a previous session left unfinished.
+    # Callbacks fire on the pipeline thread.
+    def __init__(self, name, options=None, upload_workers=4, journal_path=None,
+                 on_stage=None, on_progress=None, on_result=None):
+        self.name = name
+        self.options = qr_options(options)
+        self.upload_workers = upload_workers
+        self.journal_path = journal_path
+        self.on_stage = on_stage
+        self.on_progress = on_progress
+        self.on_result = on_result
+        self.started = time.time()
+        self.journal = None
+        self.pipeline = None
+
+    def get_journal(self):
+        if self.journal is None:
+            self.journal = JobQueue(self.journal_path)
+        return self.journal
+
+    def start(self):
+        # Raises ConfigError without an API key; a no-op once running
+        if self.pipeline is not None:
+            return
+        api_key = require_api_key()
+        # asyncio and aiohttp only load once the first upload starts
+        from pipeline import PipelineThread
+        self.pipeline = PipelineThread(
+            api_key=api_key,
+            limits={"upload": self.upload_workers},
+            qr_options=self.options,
+            journal=self.get_journal(),
+            journal_queue=self.name,
+            on_stage=self.on_stage,
+            on_progress=self.on_progress,
+            on_result=self.on_result,
+        )
+
+    def submit(self, path, tag=None, recompress=None):
+        self.start()
+        return self.pipeline.submit(path, tag, recompress)
+
+    def resumable(self):
+        # Journal rows an earlier session left unfinished (crash, closed
+        # window, network down); its finished rows are forgotten
+        journal = self.get_journal()
+        journal.clear(self.name, FINISHED)
+        return journal.resume(self.name, before=self.started)
+
+    def resume(self, row, tag=None):
+        self.start()
+        return self.pipeline.submit(row["path"], tag, options_from_json(row["recompress"]),
+                                    row["id"], row["url"])
+
+    def mark_exported(self, job_id):
+        if job_id is not None and self.journal is not None:
+            self.journal.set_state(job_id, "exported")
+
+    def forget_finished(self):
+        if self.journal is not None:
+            self.journal.clear(self.name, FINISHED + ("failed",))
+
+    def close(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
@@ -0,0 +1,316 @@
+# export.py
+# Export QR codes straight from the module matrix: SVG and PDF as vectors,
+# PNG streamed row by row at any size/DPI without building a raster first.
+#
+#   python export.py "https://i.ibb.co/abc/photo.jpg" --out qr --set png:1200px png:50mm@600 svg pdf:80mm
+import argparse
+import math
+import struct
+import sys
+import zlib
+
+import core
+
+FORMATS = ("png", "svg", "pdf")
+MM_PER_INCH = 25.4
+PT_PER_INCH = 72.0
+CSS_DPI = 96
+DEFAULT_BOX_SIZE = 10
+IDAT_CHUNK_SIZE = 64 * 1024
+UNITS = {"in": 1.0, "mm": MM_PER_INCH, "cm": MM_PER_INCH / 10, "pt": PT_PER_INCH}
+
+
+def _open_output(target):
+    # -> (file, owned): a path is opened here, a binary file object is used as-is
+    if hasattr(target, "write"):
+        return target, False
+    return open(target, "wb"), True
+
+
+def parse_size(size, dpi):
+    # -> (inches, pixels); size is an int (pixels) or "1200px", "50mm", "2in", "3cm", "144pt"
+    _check_dpi(dpi)
+    if isinstance(size, (int, float)):
+        return _finite(size, size) / dpi, int(size)
+    size = size.strip().lower()
+    if size.endswith("px"):
+        pixels = int(_finite(float(size[:-2]), size))
+        return pixels / dpi, pixels
+    for unit, per_inch in UNITS.items():
+        if size.endswith(unit):
+            inches = float(size[:-len(unit)]) / per_inch
+            return inches, round(_finite(inches * dpi, size))
+    raise ValueError(f"Unrecognised size {size!r}; use px, mm, cm, in or pt")
+
+
+def _check_dpi(dpi):
+    if dpi is not None and not dpi > 0:
+        raise ValueError(f"DPI must be positive, got {dpi!r}")
+
+
+def _finite(value, size):
+    # "infmm", "nanpx" and "1e400px" parse as floats but are no size
+    if not math.isfinite(value):
+        raise ValueError(f"Size {size!r} is not a finite length")
+    return value
+
+
+def dark_runs(row):
+    # (start, length) of each horizontal run of dark modules
+    start = None
+    for x, dark in enumerate(row):
+        if dark and start is None:
+            start = x
+        elif not dark and start is not None:
+            yield start, x - start
+            start = None
+    if start is not None:
+        yield start, len(row) - start
+
+
+def rgb(color):
+    # PIL is only needed to parse colour names, so it is imported on first use
+    from PIL import ImageColor
+    return ImageColor.getrgb(color)[:3]
+
+
+def hex_color(color):
+    return "#%02x%02x%02x" % rgb(color)
+
+
+# -- SVG ------------------------------------------------------------------
+
+def svg_bytes(matrix, size=None, dpi=CSS_DPI, fill_color="black", back_color="white"):
+    n = len(matrix)
+    if size is None:
+        width = f"{n * DEFAULT_BOX_SIZE}px"
+    elif isinstance(size, (int, float)) or size.strip().lower().endswith("px"):
+        width = f"{parse_size(size, dpi)[1]}px"
+    else:
+        width = size.strip().lower()
+    path = "".join(
+        f"M{x} {y}h{length}v1h-{length}z"
+        for y, row in enumerate(matrix)
+        for x, length in dark_runs(row)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {n} {n}" width="{width}" height="{width}" '
+        f'shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="{hex_color(back_color)}"/>'
+        f'<path fill="{hex_color(fill_color)}" d="{path}"/></svg>\n'
+    ).encode("utf-8")
+
+
+# -- PDF ------------------------------------------------------------------
+
+def pdf_color(color):
+    r, g, b = rgb(color)
+    return f"{r / 255:.4f} {g / 255:.4f} {b / 255:.4f} rg"
+
+
+def pdf_page_content(matrix, side_pt, x_pt=0.0, y_pt=0.0, fill_color="black", back_color="white"):
+    # Module grid scaled into a side_pt square whose lower-left corner is (x_pt, y_pt)
+    n = len(matrix)
+    scale = side_pt / n
+    ops = [
+        "q",
+        f"{scale:.6f} 0 0 {scale:.6f} {x_pt:.4f} {y_pt:.4f} cm",
+        pdf_color(back_color),
+        f"0 0 {n} {n} re f",
+        pdf_color(fill_color),
+    ]
+    for y, row in enumerate(matrix):
+        for x, length in dark_runs(row):
+            ops.append(f"{x} {n - 1 - y} {length} 1 re")
+    ops += ["f", "Q"]
+    return "\n".join(ops)
+
+
+class PdfWriter:
+    # Minimal multi-page PDF writer: pages are written to the file as they
+    # are added, so only the current page's content is ever in memory.
+    def __init__(self, path, page_width_pt, page_height_pt):
+        self.file, self.owned = _open_output(path)
+        self.width = page_width_pt
+        self.height = page_height_pt
+        self.offsets = {}
+        self.page_ids = []
+        self.fonts = {}
+        self.next_id = 3   # 1 = catalog, 2 = page tree
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode())
+        self.file.write(body)
+        self.file.write(b"\nendobj\n")
+
+    def font(self, base_font="Helvetica"):
+        # -> resource name of a standard Type 1 font ("F1", ...), written once
+        if base_font not in self.fonts:
+            self._object(self.next_id, (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>"
+            ).encode())
+            self.fonts[base_font] = (f"F{len(self.fonts) + 1}", self.next_id)
+            self.next_id += 1
+        return self.fonts[base_font][0]
+
+    def add_page(self, content, compressed=False):
+        # compressed=True: content is already zlib data, e.g. deflated in a worker
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        if not compressed:
+            content = zlib.compress(content.encode("ascii") if isinstance(content, str) else content)
+        self._object(content_id, f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode()
+                     + content + b"\nendstream")
+        fonts = " ".join(f"/{name} {obj_id} 0 R" for name, obj_id in self.fonts.values())
+        resources = f"<< /Font << {fonts} >> >>" if fonts else "<< >>"
+        self._object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.width:.4f} {self.height:.4f}] "
+            f"/Contents {content_id} 0 R /Resources {resources} >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{i} 0 R" for i in self.page_ids)
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        xref = self.file.tell()
+        count = self.next_id
+        self.file.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, count):
+            self.file.write(f"{self.offsets.get(obj_id, 0):010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        if self.owned:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_pdf(matrix, path, size=None, dpi=CSS_DPI, fill_color="black", back_color="white"):
+    if size is None:
+        size = len(matrix) * DEFAULT_BOX_SIZE
+    side = parse_size(size, dpi)[0] * PT_PER_INCH
+    with PdfWriter(path, side, side) as pdf:
+        pdf.add_page(pdf_page_content(matrix, side, fill_color=fill_color, back_color=back_color))
+
+
+# -- PNG ------------------------------------------------------------------
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def _packed_row(row, pixels):
+    # One pixel row for a module row at `pixels` wide, 1 bit per pixel.
+    # Pixel centres are sampled like PIL's NEAREST resize.
+    n = len(row)
+    bits = bytearray((pixels + 7) // 8)
+    for x in range(pixels):
+        if row[(2 * x + 1) * n // (2 * pixels)]:
+            bits[x >> 3] |= 0x80 >> (x & 7)
+    return bytes(bits)
+
+
+def write_png(matrix, path, size=None, dpi=None, fill_color="black", back_color="white"):
+    # 1-bit palette PNG streamed one pixel row at a time; memory is O(width)
+    _check_dpi(dpi)
+    n = len(matrix)
+    pixels = n * DEFAULT_BOX_SIZE if size is None else parse_size(size, dpi or CSS_DPI)[1]
+    palette = bytes(rgb(back_color)) + bytes(rgb(fill_color))
+
+    f, owned = _open_output(path)
+    try:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", pixels, pixels, 1, 3, 0, 0, 0)))
+        f.write(_png_chunk(b"PLTE", palette))
+        if dpi:
+            ppm = round(dpi / 0.0254)
+            f.write(_png_chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1)))
+
+        compressor = zlib.compressobj(9)
+        pending = bytearray()
+        current_module_row = None
+        line = None
+        for y in range(pixels):
+            module_row = (2 * y + 1) * n // (2 * pixels)
+            if module_row != current_module_row:
+                current_module_row = module_row
+                line = b"\x00" + _packed_row(matrix[module_row], pixels)
+            pending += compressor.compress(line)
+            if len(pending) >= IDAT_CHUNK_SIZE:
+                f.write(_png_chunk(b"IDAT", bytes(pending)))
+                pending.clear()
+        pending += compressor.flush()
+        f.write(_png_chunk(b"IDAT", bytes(pending)))
+        f.write(_png_chunk(b"IEND", b""))
+    finally:
+        if owned:
+            f.close()
+
+
+# -- entry points ---------------------------------------------------------
+
+def export_matrix(matrix, path, format=None, size=None, dpi=None, fill_color="black", back_color="white"):
+    # path may also be a binary file object, in which case format is required
+    format = (format or path.rsplit(".", 1)[-1]).lower()
+    if format == "png":
+        write_png(matrix, path, size, dpi, fill_color, back_color)
+    elif format == "svg":
+        f, owned = _open_output(path)
+        f.write(svg_bytes(matrix, size, dpi or CSS_DPI, fill_color, back_color))
+        if owned:
+            f.close()
+    elif format == "pdf":
+        write_pdf(matrix, path, size, dpi or CSS_DPI, fill_color, back_color)
+    else:
+        raise ValueError(f"Unsupported export format {format!r}, expected one of {FORMATS}")
+    return path
+
+
+def parse_variant(spec):
+    # "png:50mm@600" -> ("png", "50mm", 600); size and dpi are optional
+    format, _, rest = spec.partition(":")
+    size, _, dpi = rest.partition("@")
+    return format.lower(), size or None, int(dpi) if dpi else None
+
+
+def export_set(matrix, base_path, variants, fill_color="black", back_color="white"):
+    # Every variant is written from the same matrix: one encode, many files
+    paths = []
+    for spec in variants:
+        format, size, dpi = parse_variant(spec)
+        label = "_".join(str(part) for part in (size, f"{dpi}dpi" if dpi else None) if part)
+        path = f"{base_path}_{label}.{format}" if label else f"{base_path}.{format}"
+        paths.append(export_matrix(matrix, path, format, size, dpi, fill_color, back_color))
+    return paths
+
+
+DEFAULT_EXPORT_SET = ["png:1200px", "png:50mm@600", "svg", "pdf:50mm"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a QR code as PNG/SVG/PDF from its module matrix.")
+    parser.add_argument("data")
+    parser.add_argument("--out", default="qr_code", help="output path without extension")
+    parser.add_argument("--set", nargs="+", default=DEFAULT_EXPORT_SET,
+                        help="variants as format[:size][@dpi], e.g. png:1200px png:50mm@600 svg pdf:80mm")
+    parser.add_argument("--error-correction", choices=sorted(core.ERROR_CORRECTION), default="M")
+    parser.add_argument("--border", type=int, default=4)
+    parser.add_argument("--fill-color", default="black")
+    parser.add_argument("--back-color", default="white")
+    args = parser.parse_args(argv)
+
+    matrix = core.encode_matrix(args.data, core.ERROR_CORRECTION[args.error_correction], args.border)
+    for path in export_set(matrix, args.out, args.set, args.fill_color, args.back_color):
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+# fast_qr.py
+# Drop-in encoder producing the same module matrix as qrcode's
+# QRCode.make() + get_matrix(), without its pure-Python hot loops:
+#
+#   - bits are packed into one int instead of a bit-at-a-time BitBuffer
+#   - Reed-Solomon uses GF(256) log/antilog tables and, per ECC block size,
+#     a cached table of generator-polynomial multiples, so each data byte
+#     costs one lookup and an int XOR
+#   - function patterns, the data placement order and all 8 masks are
+#     precomputed per version; the 8 candidate matrices are built and
+#     penalty-scored at once with NumPy
+#
+# Segmenting, version fitting, block layout and the penalty rules follow
+# qrcode exactly (its tables are reused), including its scoring of masks on
+# matrices whose format/version areas are left light.
+# tests/test_fast_qr.py and benchmarks/bench_encoder.py check the two
+# encoders against each other. Since those tables are qrcode internals,
+# supported() limits the automatic switch-over to qrcode releases that
+# were checked; add a release to QRCODE_VERSIONS once the tests pass on it.
+from functools import lru_cache
+
+import numpy as np
+from qrcode import base, constants, exceptions, util
+
+OPTIMIZE_MINIMUM = 20  # qrcode's add_data() default
+QRCODE_VERSIONS = ("8.2",)
+
+
+def supported():
+    # Is the installed qrcode (major.minor) one this module was checked against?
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        installed = version("qrcode")
+    except PackageNotFoundError:
+        return False
+    return ".".join(installed.split(".")[:2]) in QRCODE_VERSIONS
+
+# GF(256) with the QR polynomial x^8 + x^4 + x^3 + x^2 + 1
+EXP = [0] * 512
+LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    EXP[_i] = _x
+    LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D
+for _i in range(255, 512):
+    EXP[_i] = EXP[_i - 255]
+
+
+@lru_cache(maxsize=None)
+def generator_poly(ec_count):
+    # prod(x - a^i) for i < ec_count, highest coefficient first
+    poly = [1]
+    for i in range(ec_count):
+        term = EXP[i]
+        poly = [a ^ (EXP[LOG[b] + LOG[term]] if b else 0) for a, b in zip(poly + [0], [0] + poly)]
+    return poly
+
+
+@lru_cache(maxsize=None)
+def remainder_table(ec_count):
+    # factor -> generator * factor (without the leading 1) as one big-endian int
+    table = [0] * 256
+    tail = generator_poly(ec_count)[1:]
+    for factor in range(1, 256):
+        log_factor = LOG[factor]
+        value = 0
+        for coefficient in tail:
+            value = (value << 8) | (EXP[log_factor + LOG[coefficient]] if coefficient else 0)
+        table[factor] = value
+    return table
+
+
+def rs_remainder(data, ec_count):
+    # data * x^ec_count mod generator, as ec_count bytes
+    table = remainder_table(ec_count)
+    shift = 8 * (ec_count - 1)
+    mask = (1 << 8 * ec_count) - 1
+    remainder = 0
+    for byte in data:
+        remainder = ((remainder << 8) & mask) ^ table[byte ^ (remainder >> shift)]
+    return remainder.to_bytes(ec_count, "big")
+
+
+# -- data bits ----------------------------------------------------------------
+
+def segments(data):
+    return [(chunk.mode, chunk.data) for chunk in util.optimal_data_chunks(data, minimum=OPTIMIZE_MINIMUM)]
+
+
+def segment_bits(segs, version):
+    # -> (value, bit count) of the mode/length headers and payloads
+    sizes = util.mode_sizes_for_version(version)
+    value = 0
+    length = 0
+
+    def put(number, bits):
+        nonlocal value, length
+        value = (value << bits) | (number & ((1 << bits) - 1))
+        length += bits
+
+    for mode, chunk in segs:
+        put(mode, 4)
+        put(len(chunk), sizes[mode])
+        if mode == util.MODE_NUMBER:
+            for i in range(0, len(chunk), 3):
+                digits = chunk[i:i + 3]
+                put(int(digits), util.NUMBER_LENGTH[len(digits)])
+        elif mode == util.MODE_ALPHA_NUM:
+            for i in range(0, len(chunk), 2):
+                pair = chunk[i:i + 2]
+                if len(pair) > 1:
+                    put(util.ALPHA_NUM.find(pair[0]) * 45 + util.ALPHA_NUM.find(pair[1]), 11)
+                else:
+                    put(util.ALPHA_NUM.find(pair), 6)
+        else:
+            put(int.from_bytes(chunk, "big"), 8 * len(chunk))
+    return value, length
+
+
+def best_fit(segs, error_correction, start=1):
+    # QRCode.best_fit(): smallest version whose capacity holds the bits
+    # counted with `start`'s length fields, re-checked when those change
+    from bisect import bisect_left
+    mode_sizes = util.mode_sizes_for_version(start)
+    needed = segment_bits(segs, start)[1]
+    version = bisect_left(util.BIT_LIMIT_TABLE[error_correction], needed, start)
+    # qrcode's version setter rejects 41 before its own overflow check
+    util.check_version(version)
+    if mode_sizes is not util.mode_sizes_for_version(version):
+        return best_fit(segs, error_correction, version)
+    return version
+
+
+def codewords(segs, version, error_correction):
+    # util.create_data(): terminator, byte alignment, 0xEC/0x11 padding, then
+    # the data and EC blocks interleaved
+    value, length = segment_bits(segs, version)
+    blocks = base.rs_blocks(version, error_correction)
+    bit_limit = sum(block.data_count for block in blocks) * 8
+    if length > bit_limit:
+        raise exceptions.DataOverflowError(
+            "Code length overflow. Data size (%s) > size available (%s)" % (length, bit_limit))
+    pad = min(bit_limit - length, 4)
+    pad += -(length + pad) % 8
+    value <<= pad
+    length += pad
+    filler = (bit_limit - length) // 8
+    payload = value.to_bytes(length // 8, "big") + (b"\xec\x11" * (filler // 2 + 1))[:filler]
+
+    data_blocks = []
+    ec_blocks = []
+    offset = 0
+    for block in blocks:
+        chunk = payload[offset:offset + block.data_count]
+        offset += block.data_count
+        data_blocks.append(chunk)
+        ec_blocks.append(rs_remainder(chunk, block.total_count - block.data_count))
+    out = bytearray()
+    for group in (data_blocks, ec_blocks):
+        for i in range(max(len(b) for b in group)):
+            out.extend(b[i] for b in group if i < len(b))
+    return bytes(out)
+
+
+# -- layout -----------------------------------------------------------------
+
+def type_info_positions(n):
+    # The 15 format bits, twice: (rows, cols) for bit i in each copy
+    vertical = [(i, 8) if i < 6 else (i + 1, 8) if i < 8 else (n - 15 + i, 8) for i in range(15)]
+    horizontal = [(8, n - i - 1) if i < 8 else (8, 15 - i) if i < 9 else (8, 15 - i - 1) for i in range(15)]
+    return vertical, horizontal
+
+
+def version_info_positions(n):
+    return ([(i // 3, i % 3 + n - 11) for i in range(18)],
+            [(i % 3 + n - 11, i // 3) for i in range(18)])
+
+
+@lru_cache(maxsize=None)
+def layout(version):
+    # -> (test template, function mask, data rows, data cols, 8 masks at the
+    # data modules in placement order). The template has every function
+    # module qrcode sets while testing masks: format/version info and the
+    # dark module are light.
+    n = version * 4 + 17
+    value = np.zeros((n, n), dtype=bool)
+    function = np.zeros((n, n), dtype=bool)
+
+    def finder(row, col):
+        for r in range(-1, 8):
+            for c in range(-1, 8):
+                if 0 <= row + r < n and 0 <= col + c < n:
+                    function[row + r, col + c] = True
+                    value[row + r, col + c] = ((0 <= r <= 6 and c in (0, 6)) or (0 <= c <= 6 and r in (0, 6))
+                                               or (2 <= r <= 4 and 2 <= c <= 4))
+
+    finder(0, 0)
+    finder(n - 7, 0)
+    finder(0, n - 7)
+    positions = util.pattern_position(version)
+    for row in positions:
+        for col in positions:
+            if function[row, col]:
+                continue
+            function[row - 2:row + 3, col - 2:col + 3] = True
+            value[row - 2:row + 3, col - 2:col + 3] = True
+            value[row - 1:row + 2, col - 1:col + 2] = False
+            value[row, col] = True
+    for i in range(8, n - 8):
+        if not function[i, 6]:
+            function[i, 6] = True
+            value[i, 6] = i % 2 == 0
+        if not function[6, i]:
+            function[6, i] = True
+            value[6, i] = i % 2 == 0
+    reserved = type_info_positions(n)
+    if version >= 7:
+        reserved += version_info_positions(n)
+    for copy in reserved:
+        for row, col in copy:
+            function[row, col] = True
+    function[n - 8, 8] = True
+
+    # map_data()'s walk: two-column strips from the right, zigzagging up
+    # and down, skipping the vertical timing column
+    rows = []
+    cols = []
+    upward = True
+    for right in range(n - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        for row in (range(n - 1, -1, -1) if upward else range(n)):
+            for col in (right, right - 1):
+                if not function[row, col]:
+                    rows.append(row)
+                    cols.append(col)
+        upward = not upward
+    rows = np.array(rows, dtype=np.intp)
+    cols = np.array(cols, dtype=np.intp)
+
+    i, j = rows, cols
+    masks = np.array([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+    ])
+    return value, function, rows, cols, masks
+
+
+def penalties(candidates):
+    # util.lost_point() for a (masks, n, n) stack, all at once
+    count, n, _ = candidates.shape
+    lines = np.concatenate([candidates, candidates.transpose(0, 2, 1)], axis=1)
+
+    # Runs of 5+ same-colored modules in a row or column: length - 2 each.
+    # A run of length L holds L - 4 uniform 5-wide windows and starts once,
+    # so L - 2 = windows + 2 * starts.
+    same = lines[:, :, 1:] == lines[:, :, :-1]
+    pairs = same[:, :, :-1] & same[:, :, 1:]
+    uniform = pairs[:, :, :-2] & pairs[:, :, 2:]
+    starts = uniform[:, :, 0].sum(axis=1) + (uniform[:, :, 1:] & ~uniform[:, :, :-1]).sum(axis=(1, 2))
+    scores = uniform.sum(axis=(1, 2)) + 2 * starts
+
+    # 2x2 blocks of one color: 3 each
+    top = candidates[:, :-1, :-1]
+    blocks = (top == candidates[:, 1:, :-1]) & (top == candidates[:, :-1, 1:]) & (top == candidates[:, 1:, 1:])
+    scores += 3 * blocks.sum(axis=(1, 2))
+
+    # 11-module windows reading 10111010000 or 00001011101 (a finder-like
+    # 1:1:3:1:1 with 4 light modules on one side): 40 each
+    on = [lines[:, :, k:n - 10 + k] for k in range(11)]
+    off = [~module for module in on]
+    shared = off[1] & on[4] & off[5] & on[6] & off[9]
+    pattern1 = on[0] & on[2] & on[3] & off[7] & off[8] & off[10]
+    pattern2 = off[0] & off[2] & off[3] & on[7] & on[8] & on[10]
+    scores += 40 * (shared & (pattern1 | pattern2)).sum(axis=(1, 2))
+
+    # Dark-module balance: 10 per full 5% away from half, in qrcode's float math
+    dark = candidates.sum(axis=(1, 2))
+    for index in range(count):
+        percent = float(dark[index]) / (n ** 2)
+        scores[index] += int(abs(percent * 100 - 50) / 5) * 10
+    return scores
+
+
+def encode(data, error_correction=constants.ERROR_CORRECT_M, border=4, version=None):
+    # -> module matrix with border, a tuple of bytes rows like
+    # core.encode_matrix, for the same arguments as core.build_qr
+    segs = segments(data)
+    if version is None:
+        version = best_fit(segs, error_correction)
+    else:
+        util.check_version(version)
+    words = codewords(segs, version, error_correction)
+    template, function, rows, cols, masks = layout(version)
+    n = len(template)
+
+    bits = np.zeros(len(rows), dtype=bool)
+    bits[:len(words) * 8] = np.unpackbits(np.frombuffer(words, dtype=np.uint8)).astype(bool)
+    placed = masks ^ bits
+
+    candidates = np.repeat(template[np.newaxis], 8, axis=0)
+    candidates[:, rows, cols] = placed
+    pattern = int(np.argmin(penalties(candidates)))
+
+    matrix = candidates[pattern]
+    type_bits = util.BCH_type_info((error_correction << 3) | pattern)
+    for copy in type_info_positions(n):
+        for i, (row, col) in enumerate(copy):
+            matrix[row, col] = (type_bits >> i) & 1
+    if version >= 7:
+        version_bits = util.BCH_type_number(version)
+        for copy in version_info_positions(n):
+            for i, (row, col) in enumerate(copy):
+                matrix[row, col] = (version_bits >> i) & 1
+    matrix[n - 8, 8] = True
+
+    if border:
+        matrix = np.pad(matrix, border)
+    return tuple(row.tobytes() for row in matrix.astype(np.uint8))
@@ -0,0 +1,133 @@
+# imgbb_stub.py
+# Local stand-in for https://api.imgbb.com/1/upload for load tests.
+# Same multipart contract (key + image fields) and the same
+# {"data": {"url": ...}} response, with knobs for latency, errors and bandwidth.
+#
+#   python imgbb_stub.py --port 8765 --latency 0.05 --error-rate 0.02 --bandwidth 2000000
+#   IMGBB_UPLOAD_URL=http://127.0.0.1:8765/1/upload python batch.py photos/
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from multipart import parse_multipart
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self, length):
+        # Reading at most `bandwidth` bytes per second throttles the client too
+        chunks = []
+        remaining = length
+        bandwidth = self.server.bandwidth
+        while remaining:
+            started = time.perf_counter()
+            chunk = self.rfile.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            if bandwidth:
+                delay = len(chunk) / bandwidth - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        return b"".join(chunks)
+
+    def do_POST(self):
+        body = self.read_body(int(self.headers.get("Content-Length", 0)))
+        self.server.count_request(len(body))
+
+        latency = self.server.latency + random.uniform(0, self.server.jitter)
+        if latency:
+            time.sleep(latency)
+        if random.random() < self.server.error_rate:
+            self.send_json(500, {"status_code": 500, "error": {"message": "Injected failure"}})
+            return
+
+        fields = parse_multipart(self.headers.get("Content-Type", ""), body)
+        if "key" not in fields:
+            self.send_json(400, {"status_code": 400, "error": {"message": "Empty upload key"}})
+            return
+        if "image" not in fields:
+            self.send_json(400, {"status_code": 400, "error": {"message": "Empty upload source"}})
+            return
+
+        filename, data = fields["image"]
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        host = self.headers.get("Host", "127.0.0.1")
+        url = f"http://{host}/i/{digest}/{filename or 'image'}"
+        self.send_json(200, {"data": {"id": digest, "url": url, "size": len(data)},
+                             "success": True, "status": 200})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, bandwidth=0, quiet=True):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.quiet = quiet
+        self.requests = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+
+    def count_request(self, nbytes):
+        with self.lock:
+            self.requests += 1
+            self.bytes_received += nbytes
+
+    @property
+    def upload_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/1/upload"
+
+
+def start_in_thread(port=0, **options):
+    server = StubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local imgbb-compatible upload server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, 0..jitter seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of uploads answered with 500")
+    parser.add_argument("--bandwidth", type=int, default=0, help="per-connection upload cap in bytes/s")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = StubServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, bandwidth=args.bandwidth, quiet=not args.verbose)
+    print(f"imgbb stub listening on {server.upload_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# job_queue.py
+# Durable journal of every image handed to an upload, so a crash, a closed
+# window or a dropped network resumes the batch instead of starting over.
+#
+#   pending -> uploading -> uploaded -> rendered -> exported
+#                 \-> failed (retried on the next resume)
+#
+# "uploaded" rows carry the URL, so resuming them never touches the network;
+# rows caught in "uploading" go round again and the upload cache turns a
+# finished-but-unrecorded upload into a cache hit.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from upload_cache import default_cache_dir
+
+STATES = ("pending", "uploading", "uploaded", "rendered", "exported", "failed")
+UNFINISHED = ("pending", "uploading", "uploaded", "failed")
+FINISHED = ("rendered", "exported")
+# Failed runs after which a row is no longer resumed on its own
+MAX_ATTEMPTS = 3
+
+
+def file_signature(path):
+    # (size, mtime_ns), or (None, None) when the file is gone
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+def options_to_json(recompress):
+    return json.dumps(vars(recompress)) if recompress else None
+
+
+def options_from_json(text):
+    if not text:
+        return None
+    from recompress import RecompressOptions
+    return RecompressOptions(**json.loads(text))
+
+
+class JobQueue:
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(default_cache_dir(), exist_ok=True)
+            path = os.path.join(default_cache_dir(), "jobs.sqlite3")
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " queue TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " url TEXT,"
+            " qr_path TEXT,"
+            " error TEXT,"
+            " recompress TEXT,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue_state ON jobs(queue, state)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue_path ON jobs(queue, path)")
+        self.conn.commit()
+
+    def add(self, path, queue="default", recompress=None):
+        path = os.path.abspath(path)
+        size, mtime_ns = file_signature(path)
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (queue, path, state, recompress, size, mtime_ns, created, updated)"
+                " VALUES (?, ?, 'pending', ?, ?, ?, ?, ?)",
+                (queue, path, options_to_json(recompress), size, mtime_ns, now, now),
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def ensure(self, paths, queue="default", recompress=None):
+        # One row per path, reusing what an earlier run of the same queue
+        # recorded. Rows whose file changed since are started over.
+        rows = []
+        for path in paths:
+            path = os.path.abspath(path)
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT * FROM jobs WHERE queue = ? AND path = ? ORDER BY id DESC LIMIT 1",
+                    (queue, path),
+                ).fetchone()
+            if row is None:
+                job_id = self.add(path, queue, recompress)
+            else:
+                job_id = row["id"]
+                if self.is_stale(row) or row["recompress"] != options_to_json(recompress):
+                    self.reset(job_id, recompress)
+            rows.append(self.get(job_id))
+        return rows
+
+    def is_stale(self, row):
+        return file_signature(row["path"]) != (row["size"], row["mtime_ns"])
+
+    def reset(self, job_id, recompress=None):
+        size, mtime_ns = file_signature(self.get(job_id)["path"])
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'pending', url = NULL, qr_path = NULL, error = NULL, attempts = 0,"
+                " recompress = ?, size = ?, mtime_ns = ?, updated = ? WHERE id = ?",
+                (options_to_json(recompress), size, mtime_ns, time.time(), job_id),
+            )
+            self.conn.commit()
+
+    def set_state(self, job_id, state, url=None, qr_path=None, error=None):
+        if state not in STATES:
+            raise ValueError(f"Unknown job state {state!r}, expected one of {STATES}")
+        # url/qr_path are only ever filled in, never cleared, by a transition;
+        # attempts counts the runs that ended in "failed"
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, url = COALESCE(?, url), qr_path = COALESCE(?, qr_path),"
+                " error = ?, attempts = attempts + ?, updated = ? WHERE id = ?",
+                (state, url, qr_path, error, 1 if state == "failed" else 0, time.time(), job_id),
+            )
+            self.conn.commit()
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def jobs(self, queue="default", states=None):
+        query = "SELECT * FROM jobs WHERE queue = ?"
+        params = [queue]
+        if states:
+            query += " AND state IN (%s)" % ",".join("?" * len(states))
+            params += list(states)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query + " ORDER BY id", params)]
+
+    def unfinished(self, queue="default"):
+        return self.jobs(queue, UNFINISHED)
+
+    def resume(self, queue="default", before=None, max_attempts=MAX_ATTEMPTS):
+        # Unfinished rows to submit again, optionally only those created
+        # before `before` (an earlier session's). A URL is kept unless the
+        # file was edited after it was uploaded; then the row starts over.
+        # Rows whose file is gone are dropped, and failed rows that used up
+        # max_attempts stay failed until the file changes or is re-added.
+        rows = []
+        missing = []
+        for row in self.unfinished(queue):
+            if before is not None and row["created"] >= before:
+                continue
+            if not os.path.exists(row["path"]):
+                missing.append(row["id"])
+                continue
+            if row["state"] == "failed" and row["attempts"] >= max_attempts:
+                if not self.is_stale(row):
+                    continue
+                self.reset(row["id"], options_from_json(row["recompress"]))
+                row = self.get(row["id"])
+            if row["url"] and os.path.exists(row["path"]) and self.is_stale(row):
+                self.reset(row["id"], options_from_json(row["recompress"]))
+                row = self.get(row["id"])
+            rows.append(row)
+        if missing:
+            self.remove(missing)
+        return rows
+
+    def counts(self, queue="default"):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE queue = ? GROUP BY state", (queue,)
+            ).fetchall()
+        return {state: count for state, count in rows}
+
+    def remove(self, job_ids):
+        with self.lock:
+            self.conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in job_ids])
+            self.conn.commit()
+
+    def clear(self, queue="default", states=None):
+        query = "DELETE FROM jobs WHERE queue = ?"
+        params = [queue]
+        if states:
+            query += " AND state IN (%s)" % ",".join("?" * len(states))
+            params += list(states)
+        with self.lock:
+            self.conn.execute(query, params)
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
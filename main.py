@@ -1,30 +1,59 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
-import qrcode
-import requests
-import io
-import threading
 import os
-from dotenv import load_dotenv
+import threading
+
+import engine
+import metrics
+
 
-load_dotenv()
-IMGBB_API_KEY = os.getenv("IMGBB_API_KEY")
-if not IMGBB_API_KEY:
-    print("❌ IMGBB_API_KEY not found in .env")
-    sys.exit(1)
+UPLOAD_WORKERS = 4
+JOURNAL_QUEUE = "tk"
+# Quiet period after the last size change before the preview is redrawn
+PREVIEW_DEBOUNCE_MS = 80
 
 class QRCodeGenerator:
     def __init__(self, root):
         self.root = root
+        self.session = engine.UploadSession(
+            JOURNAL_QUEUE,
+            upload_workers=UPLOAD_WORKERS,
+            on_stage=self.on_pipeline_stage,
+            on_progress=self.on_pipeline_progress,
+            on_result=self.on_pipeline_result,
+        )
+        self.queue_items = {}
+        self.batch_total = 0
+        self.batch_done = 0
+        self.batch_errors = []
+        # Bytes sent per queue item while it uploads, for the progress bar
+        self.item_sent = {}
+        self.item_fraction = {}
+        self.meter = engine.ThroughputMeter()
+        self.preview = engine.PreviewRenderer(self.on_preview_ready, self.on_preview_error)
+        self.preview_after = None
         self.setup_window()
         self.create_widgets()
-        self.current_qr_image = None
+        self.current_qr_matrix = None
         self.current_url = ""
+        self.current_job_id = None
+        # Imports and .env are loaded once the window is up, not before it
+        self.root.after_idle(self.start_warm_up)
+
+    def start_warm_up(self):
+        threading.Thread(target=engine.warm_up, daemon=True).start()
+        self.root.after_idle(self.resume_jobs)
+
+    def resume_jobs(self):
+        # Uploads the last session did not finish (crash, closed window,
+        # network down) are queued again
+        resumed = self.session.resumable()
+        if resumed:
+            self.enqueue_uploads([row["path"] for row in resumed], resumed)
         
     def setup_window(self):
         self.root.title("QR Code Generator Pro")
-        self.root.geometry("600x700")
+        self.root.geometry("600x820")
         self.root.resizable(True, True)
         self.root.configure(bg='#f0f0f0')
         
@@ -58,13 +87,36 @@ class QRCodeGenerator:
         upload_frame.pack(fill=tk.X, pady=(0, 15))
         
         self.upload_button = ttk.Button(upload_frame, 
-                                      text="📤 Browse & Upload Image", 
+                                      text="📤 Browse & Upload Images", 
                                       command=self.handle_upload_and_generate,
                                       style='Modern.TButton')
         self.upload_button.pack(pady=5)
         
+        # Optional downscale/re-encode before upload
+        self.shrink_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(upload_frame, text="🗜️ Shrink images before upload (max 2048px JPEG)", 
+                        variable=self.shrink_var).pack()
+        
+        # Upload queue
+        queue_frame = ttk.Frame(upload_frame)
+        queue_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        self.queue_tree = ttk.Treeview(queue_frame, columns=("file", "status", "saved"), 
+                                     show="headings", height=4, selectmode="browse")
+        self.queue_tree.heading("file", text="File")
+        self.queue_tree.heading("status", text="Status")
+        self.queue_tree.heading("saved", text="Saved")
+        self.queue_tree.column("status", width=100, stretch=False)
+        self.queue_tree.column("saved", width=140, stretch=False)
+        queue_scrollbar = ttk.Scrollbar(queue_frame, orient=tk.VERTICAL, command=self.queue_tree.yview)
+        self.queue_tree.configure(yscrollcommand=queue_scrollbar.set)
+        self.queue_tree.bind('<<TreeviewSelect>>', self.show_selected_item)
+        
+        self.queue_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        queue_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
         # Progress bar
-        self.progress = ttk.Progressbar(upload_frame, mode='indeterminate')
+        self.progress = ttk.Progressbar(upload_frame, mode='determinate')
         self.progress.pack(fill=tk.X, pady=(10, 0))
         self.progress.pack_forget()  # Initially hidden
         
@@ -131,62 +183,63 @@ class QRCodeGenerator:
                                     style='Save.TButton')
         self.save_button.pack(side=tk.LEFT)
         
+        # Export set button: PNG/SVG/PDF variants from one encode
+        self.export_set_button = ttk.Button(save_frame, text="📦 Export Set", 
+                                          command=self.export_qr_set, 
+                                          state=tk.DISABLED)
+        self.export_set_button.pack(side=tk.LEFT, padx=(10, 0))
+        
         # Clear button
         self.clear_button = ttk.Button(save_frame, text="🗑️ Clear", 
                                      command=self.clear_all, 
                                      state=tk.DISABLED)
         self.clear_button.pack(side=tk.LEFT, padx=(10, 0))
         
-    def upload_image_to_imgbb(self, image_path, api_key):
-        with open(image_path, "rb") as file:
-            url = "https://api.imgbb.com/1/upload"
-            payload = {"key": api_key}
-            files = {"image": file}
-            response = requests.post(url, data=payload, files=files)
-            if response.status_code == 200:
-                return response.json()['data']['url']
-            else:
-                raise Exception("Image upload failed:\n" + response.text)
-    
-    def generate_qr_code(self, data, size='Medium'):
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # Create QR code image
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        return qr_img
-    
     def get_display_size(self):
         size_map = {"Small": 150, "Medium": 200, "Large": 250}
         return size_map.get(self.size_var.get(), 200)
     
-    def show_qr_on_label(self, qr_img):
-        bio = io.BytesIO()
-        qr_img.save(bio, format="PNG")
-        bio.seek(0)
-        qr_img_tk = Image.open(bio)
-        
-        # Resize based on selected size
-        display_size = self.get_display_size()
-        qr_img_tk = qr_img_tk.resize((display_size, display_size), Image.Resampling.LANCZOS)
-        
-        qr_photo = ImageTk.PhotoImage(qr_img_tk)
-        self.qr_label.config(image=qr_photo, text="")
-        self.qr_label.image = qr_photo
+    def show_qr_on_label(self, matrix):
+        # Rasterized from the modules on the preview worker; a newer request
+        # supersedes this one
+        style = engine.DEFAULT_STYLE
+        self.preview.request(self.get_display_size(), style["fill_color"], style["back_color"], matrix=matrix)
+    
+    def on_preview_ready(self, token, matrix, image):
+        # Worker thread: Tk objects are only touched back on the main loop
+        self.root.after(0, lambda: self.display_preview(token, image))
+    
+    def display_preview(self, token, image):
+        if not self.preview.is_current(token):
+            return
+        from PIL import ImageTk
+        with metrics.span("preview"):
+            qr_photo = ImageTk.PhotoImage(image)
+            self.qr_label.config(image=qr_photo, text="")
+            self.qr_label.image = qr_photo
+    
+    def on_preview_error(self, token, message):
+        self.root.after(0, lambda: self.display_preview_error(token, message))
+    
+    def display_preview_error(self, token, message):
+        if self.preview.is_current(token):
+            self.qr_label.config(image='', text=f"No QR preview: {message}")
+            self.qr_label.image = None
     
     def update_qr_size(self, event=None):
-        if self.current_qr_image:
-            self.show_qr_on_label(self.current_qr_image)
+        # Debounced: a burst of changes only renders the last one
+        if self.preview_after is not None:
+            self.root.after_cancel(self.preview_after)
+        self.preview_after = self.root.after(PREVIEW_DEBOUNCE_MS, self.regenerate_preview)
+    
+    def regenerate_preview(self):
+        self.preview_after = None
+        if self.current_qr_matrix:
+            self.show_qr_on_label(self.current_qr_matrix)
     
     def handle_upload_and_generate(self):
-        image_path = filedialog.askopenfilename(
-            title="Select Image File",
+        image_paths = filedialog.askopenfilenames(
+            title="Select Image Files",
             filetypes=[
                 ("Image Files", "*.jpg *.jpeg *.png *.gif *.bmp"),
                 ("JPEG Files", "*.jpg *.jpeg"),
@@ -195,36 +248,127 @@ class QRCodeGenerator:
             ]
         )
         
-        if not image_path:
+        if not image_paths:
             return
         
-        # Start upload in separate thread
-        def upload_thread():
-            try:
-                self.root.after(0, self.start_upload_ui)
-                url = self.upload_image_to_imgbb(image_path, IMGBB_API_KEY)
-                qr = self.generate_qr_code(url)
-                
-                # Update UI in main thread
-                self.root.after(0, lambda: self.upload_success(url, qr))
-                
-            except Exception as e:
-                self.root.after(0, lambda: self.upload_error(str(e)))
+        self.enqueue_uploads(image_paths)
+    
+    def enqueue_uploads(self, image_paths, resumed=None):
+        # Selecting more files while a batch runs adds them to that batch
+        if self.batch_done == self.batch_total:
+            self.batch_total = 0
+            self.batch_done = 0
+            self.batch_errors = []
+            self.meter.reset()
+        
+        try:
+            self.session.start()
+        except engine.ConfigError as e:
+            messagebox.showerror("Configuration Error", f"❌ {e}")
+            return
+        
+        recompress = engine.RecompressOptions() if self.shrink_var.get() else None
+        for index, image_path in enumerate(image_paths):
+            row = resumed[index] if resumed else None
+            status = "Resumed" if row else "Queued"
+            item = self.queue_tree.insert('', tk.END, values=(os.path.basename(image_path), status, ""))
+            self.queue_items[item] = {"path": image_path, "url": None, "matrix": None, "job_id": None}
+            self.batch_total += 1
+            if row:
+                self.session.resume(row, tag=item)
+            else:
+                self.session.submit(image_path, tag=item, recompress=recompress)
         
-        threading.Thread(target=upload_thread, daemon=True).start()
+        self.start_upload_ui()
+    
+    def on_pipeline_stage(self, job, stage):
+        # Runs on the pipeline thread; UI updates go through root.after
+        item = job.tag
+        if stage == "read":
+            self.root.after(0, lambda: self.set_item_status(item, "Uploading"))
+        elif stage == "recompress" and job.prepared:
+            summary = job.prepared.describe(engine.upload_throughput())
+            self.root.after(0, lambda: self.set_item_status(item, summary, column="saved"))
+    
+    def on_pipeline_progress(self, job, sent, total):
+        item = job.tag
+        self.root.after(0, lambda: self.item_progress(item, sent, total))
+    
+    def item_progress(self, item, sent, total):
+        # A retry rewinds the upload, so bytes sent can go backwards
+        self.meter.add(max(0, sent - self.item_sent.get(item, 0)))
+        self.item_sent[item] = sent
+        self.item_fraction[item] = sent / total if total else 1.0
+        self.set_item_status(item, f"Uploading {self.item_fraction[item]:.0%}")
+        self.update_progress()
+    
+    def update_progress(self):
+        # Whole files done plus the part of each in-flight upload already sent
+        self.progress.config(value=self.batch_done + sum(self.item_fraction.values()))
+        rate = engine.format_rate(self.meter.rate())
+        self.status_label.config(text=f"Uploading {self.batch_done}/{self.batch_total}..." +
+                                 (f"  {rate}" if rate else ""))
+    
+    def on_pipeline_result(self, job):
+        item = job.tag
+        if job.ok:
+            url, matrix, job_id = job.url, job.matrix, job.job_id
+            self.root.after(0, lambda: self.item_success(item, url, matrix, job_id))
+        else:
+            error_msg = job.error
+            self.root.after(0, lambda: self.item_error(item, error_msg))
+    
+    def set_item_status(self, item, status, column="status"):
+        if self.queue_tree.exists(item):
+            self.queue_tree.set(item, column, status)
     
     def start_upload_ui(self):
-        self.upload_button.config(state=tk.DISABLED)
+        self.progress.config(maximum=self.batch_total, value=self.batch_done)
         self.progress.pack(fill=tk.X, pady=(10, 0))
-        self.progress.start()
-        self.status_label.config(text="Uploading image...", foreground='#0066cc')
+        self.status_label.config(text=f"Uploading {self.batch_done}/{self.batch_total}...", 
+                                 foreground='#0066cc')
     
-    def upload_success(self, url, qr):
-        self.progress.stop()
-        self.progress.pack_forget()
-        self.upload_button.config(state=tk.NORMAL)
-        self.status_label.config(text="Upload successful!", foreground='#006600')
+    def item_success(self, item, url, matrix, job_id=None):
+        self.queue_items[item].update(url=url, matrix=matrix, job_id=job_id)
+        self.forget_progress(item)
+        self.set_item_status(item, "Done")
+        self.upload_success(url, matrix, job_id)
+        self.item_finished()
+    
+    def item_error(self, item, error_msg):
+        self.forget_progress(item)
+        self.set_item_status(item, "Failed")
+        self.batch_errors.append(f"{os.path.basename(self.queue_items[item]['path'])}: {error_msg}")
+        self.item_finished()
+    
+    def forget_progress(self, item):
+        self.item_sent.pop(item, None)
+        self.item_fraction.pop(item, None)
+    
+    def item_finished(self):
+        self.batch_done += 1
+        if self.batch_done < self.batch_total:
+            self.update_progress()
+            return
+        self.progress.config(value=self.batch_done)
         
+        self.progress.pack_forget()
+        failed = len(self.batch_errors)
+        if failed:
+            self.status_label.config(text=f"{self.batch_total - failed} uploaded, {failed} failed", 
+                                     foreground='#cc0000')
+            messagebox.showerror("Error", "Upload failed:\n" + "\n".join(self.batch_errors))
+        else:
+            self.status_label.config(text="Upload successful!", foreground='#006600')
+            messagebox.showinfo("Success", f"{self.batch_total} image(s) uploaded and QR codes generated successfully!")
+    
+    def show_selected_item(self, event=None):
+        selection = self.queue_tree.selection()
+        if selection and self.queue_items[selection[0]]["url"]:
+            entry = self.queue_items[selection[0]]
+            self.upload_success(entry["url"], entry["matrix"], entry["job_id"])
+    
+    def upload_success(self, url, matrix, job_id=None):
         # Update URL display
         self.url_text.config(state=tk.NORMAL)
         self.url_text.delete(1.0, tk.END)
@@ -233,24 +377,17 @@ class QRCodeGenerator:
         
         # Store current data
         self.current_url = url
-        self.current_qr_image = qr
+        self.current_qr_matrix = matrix
+        self.current_job_id = job_id
         
         # Show QR code
-        self.show_qr_on_label(qr)
+        self.show_qr_on_label(matrix)
         
         # Enable buttons
         self.save_button.config(state=tk.NORMAL)
+        self.export_set_button.config(state=tk.NORMAL)
         self.clear_button.config(state=tk.NORMAL)
         self.copy_button.config(state=tk.NORMAL)
-        
-        messagebox.showinfo("Success", "Image uploaded and QR code generated successfully!")
-    
-    def upload_error(self, error_msg):
-        self.progress.stop()
-        self.progress.pack_forget()
-        self.upload_button.config(state=tk.NORMAL)
-        self.status_label.config(text="Upload failed", foreground='#cc0000')
-        messagebox.showerror("Error", f"Upload failed:\n{error_msg}")
     
     def copy_url(self):
         if self.current_url:
@@ -259,13 +396,15 @@ class QRCodeGenerator:
             messagebox.showinfo("Copied", "URL copied to clipboard!")
     
     def save_qr_image(self):
-        if not self.current_qr_image:
+        if not self.current_qr_matrix:
             return
             
         path = filedialog.asksaveasfilename(
             defaultextension=".png",
             filetypes=[
                 ("PNG Files", "*.png"),
+                ("SVG Files", "*.svg"),
+                ("PDF Files", "*.pdf"),
                 ("JPEG Files", "*.jpg"),
                 ("All Files", "*.*")
             ],
@@ -274,12 +413,32 @@ class QRCodeGenerator:
         
         if path:
             try:
-                self.current_qr_image.save(path)
+                engine.save(self.current_qr_matrix, path)
+                self.session.mark_exported(self.current_job_id)
                 messagebox.showinfo("Saved", f"QR Code saved successfully to:\n{os.path.basename(path)}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save QR code:\n{str(e)}")
     
+    def export_qr_set(self):
+        if not self.current_qr_matrix:
+            return
+        
+        folder = filedialog.askdirectory(title="Export QR Code Set")
+        if folder:
+            try:
+                paths = engine.export_set(self.current_qr_matrix, os.path.join(folder, "qr_code"))
+                self.session.mark_exported(self.current_job_id)
+                messagebox.showinfo("Saved", "QR Code set saved:\n" + "\n".join(os.path.basename(p) for p in paths))
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export QR codes:\n{str(e)}")
+    
     def clear_all(self):
+        # Drop any preview still pending
+        if self.preview_after is not None:
+            self.root.after_cancel(self.preview_after)
+            self.preview_after = None
+        self.preview.cancel()
+        
         # Clear URL
         self.url_text.config(state=tk.NORMAL)
         self.url_text.delete(1.0, tk.END)
@@ -290,16 +449,24 @@ class QRCodeGenerator:
         self.qr_label.image = None
         
         # Reset variables
-        self.current_qr_image = None
+        self.current_qr_matrix = None
         self.current_url = ""
+        self.current_job_id = None
         
         # Disable buttons
         self.save_button.config(state=tk.DISABLED)
+        self.export_set_button.config(state=tk.DISABLED)
         self.clear_button.config(state=tk.DISABLED)
         self.copy_button.config(state=tk.DISABLED)
         
-        # Reset status
-        self.status_label.config(text="Ready to upload", foreground='#666')
+        # Drop finished queue entries unless a batch is still running
+        if self.batch_done == self.batch_total:
+            self.queue_tree.delete(*self.queue_tree.get_children())
+            self.queue_items.clear()
+            self.session.forget_finished()
+            
+            # Reset status
+            self.status_label.config(text="Ready to upload", foreground='#666')
 
 # 🖼️ Main application
 def main():
@@ -0,0 +1,259 @@
+# metrics.py
+# Lightweight timing spans for the upload -> QR -> preview path. Spans feed
+# per-name histograms that the Qt Settings tab shows and that can be
+# written out as JSON or Prometheus text.
+#
+#   with metrics.span("upload"):
+#       ...
+#   metrics.export("metrics.prom")
+#
+# ProfileCapture is the opt-in heavy mode for bug reports: cProfile for the
+# thread that starts it, a stack sampler for every other thread (cProfile
+# only sees its own thread) and a tracemalloc snapshot.
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Upper bounds in seconds, Prometheus style; the last bucket is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 1000
+SPARK = " ▁▂▃▄▅▆▇█"
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        # Recent raw samples for exact percentiles in the UI
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, pct):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))]
+
+    def sparkline(self):
+        # One character per bucket, scaled to the fullest one
+        peak = max(self.counts) or 1
+        return "".join(SPARK[round(c / peak * (len(SPARK) - 1))] if c else SPARK[0] for c in self.counts)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_s": self.sum / self.count if self.count else 0.0,
+            "min_s": self.min or 0.0,
+            "max_s": self.max or 0.0,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "p99_s": self.percentile(99),
+            "buckets": {("+Inf" if i == len(BUCKETS) else repr(BUCKETS[i])): c
+                        for i, c in enumerate(self.counts)},
+        }
+
+
+class Span:
+    __slots__ = ("registry", "name", "started")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.enabled = True
+
+    def span(self, name):
+        return Span(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: h.as_dict() for name, h in sorted(self.histograms.items())}
+
+    def rows(self):
+        # (name, count, mean_s, p50_s, p95_s, max_s, sparkline) for display
+        with self.lock:
+            return [
+                (name, h.count, h.sum / h.count, h.percentile(50), h.percentile(95), h.max, h.sparkline())
+                for name, h in sorted(self.histograms.items()) if h.count
+            ]
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def to_json(self):
+        return json.dumps({"generated": time.time(), "spans": self.snapshot()}, indent=2)
+
+    def to_prometheus(self, metric="qr_span_seconds"):
+        lines = [f"# HELP {metric} Time spent per span of the upload/QR/render path.",
+                 f"# TYPE {metric} histogram"]
+        for name, h in self.snapshot().items():
+            cumulative = 0
+            for le, count in h["buckets"].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {h["sum_s"]:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {h["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, format=None):
+        # format: "json" or "prometheus"; by default .json -> JSON, anything else Prometheus
+        format = format or ("json" if path.lower().endswith(".json") else "prometheus")
+        text = self.to_json() if format == "json" else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+
+REGISTRY = Registry()
+
+
+def span(name):
+    return REGISTRY.span(name)
+
+
+def observe(name, seconds):
+    REGISTRY.observe(name, seconds)
+
+
+def export(path, format=None):
+    return REGISTRY.export(path, format)
+
+
+class StackSampler:
+    # Samples every thread's stack at a fixed interval; the result is in
+    # collapsed-stack format (flamegraph.pl, speedscope)
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileCapture:
+    def __init__(self, out_dir, sample_interval=0.005, memory_frames=25):
+        self.out_dir = out_dir
+        self.sample_interval = sample_interval
+        self.memory_frames = memory_frames
+        self.profiler = None
+        self.sampler = None
+        self.running = False
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+        tracemalloc.start(self.memory_frames)
+        self.sampler = StackSampler(self.sample_interval)
+        self.sampler.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        self.running = True
+
+    def stop(self):
+        # Writes the capture into out_dir and returns the file paths
+        import io
+        import pstats
+        import tracemalloc
+        self.profiler.disable()
+        self.sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        self.running = False
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = {
+            "pstats": os.path.join(self.out_dir, f"profile-{stamp}.pstats"),
+            "profile": os.path.join(self.out_dir, f"profile-{stamp}.txt"),
+            "stacks": os.path.join(self.out_dir, f"stacks-{stamp}.collapsed"),
+            "memory": os.path.join(self.out_dir, f"memory-{stamp}.txt"),
+            "metrics": os.path.join(self.out_dir, f"metrics-{stamp}.json"),
+        }
+        self.profiler.dump_stats(paths["pstats"])
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(60)
+        with open(paths["profile"], "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        with open(paths["stacks"], "w", encoding="utf-8") as f:
+            f.write(self.sampler.collapsed())
+        with open(paths["memory"], "w", encoding="utf-8") as f:
+            for stat in snapshot.statistics("traceback")[:30]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                f.write("\n".join("    " + line for line in stat.traceback.format()) + "\n\n")
+        REGISTRY.export(paths["metrics"], "json")
+        return paths
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,174 @@
+# multipart.py
+# Streaming multipart/form-data body for uploads. The image is read from an
+# mmap of the file (or from bytes already in memory) one chunk at a time, so
+# the payload is never assembled in memory, and bytes sent are reported as
+# the HTTP client pulls them.
+import mmap
+import os
+import time
+import uuid
+from collections import deque
+
+CHUNK_SIZE = 64 * 1024
+PROGRESS_INTERVAL = 0.05
+
+
+class MultipartStream:
+    # File-like (read/seek/tell/len) for requests and urllib3, whose retries
+    # rewind it with seek(); chunks() feeds aiohttp.
+    def __init__(self, fields, file_field, filename, path=None, data=None,
+                 on_progress=None, chunk_size=CHUNK_SIZE):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+            f'filename="{filename.replace(chr(34), "%22")}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+
+        self.file = None
+        self.map = None
+        if path is not None:
+            self.file = open(path, "rb")
+            # mmap cannot map an empty file
+            if os.fstat(self.file.fileno()).st_size:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                body = self.map
+            else:
+                body = b""
+        else:
+            body = data
+
+        self.spans = []
+        offset = 0
+        for part in (head, body, tail):
+            self.spans.append((offset, part))
+            offset += len(part)
+        self.total = offset
+        self.position = 0
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.started = None
+        self.reported = 0.0
+
+    def __len__(self):
+        return self.total
+
+    def read(self, size=-1):
+        if self.started is None:
+            self.started = time.perf_counter()
+        end = self.total if size is None or size < 0 else min(self.total, self.position + size)
+        chunk = b"".join(
+            part[max(0, self.position - start):end - start]
+            for start, part in self.spans
+            if start < end and start + len(part) > self.position
+        )
+        self.position = end
+        self._report()
+        return chunk
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.total
+        self.position = max(0, min(self.total, offset))
+        return self.position
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    async def chunks(self):
+        for chunk in self:
+            yield chunk
+
+    def _report(self):
+        # At most every PROGRESS_INTERVAL seconds, and always at the end
+        if self.on_progress is None:
+            return
+        now = time.perf_counter()
+        if self.position < self.total and now - self.reported < PROGRESS_INTERVAL:
+            return
+        self.reported = now
+        self.on_progress(self.position, self.total)
+
+    @property
+    def throughput(self):
+        # bytes/s since the first read
+        if self.started is None:
+            return None
+        elapsed = time.perf_counter() - self.started
+        return self.position / elapsed if elapsed > 0 else None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_multipart(content_type, body):
+    # Receiving side: {field name: (filename or None, bytes)}
+    from email.parser import BytesParser
+    from email.policy import HTTP
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+    return fields
+
+
+class ThroughputMeter:
+    # Bytes/s over a sliding window, fed with byte deltas from any number
+    # of concurrent uploads
+    def __init__(self, window=2.0):
+        self.window = window
+        self.samples = deque()
+
+    def add(self, nbytes):
+        now = time.perf_counter()
+        self.samples.append((now, nbytes))
+        while self.samples and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+
+    def rate(self):
+        if len(self.samples) < 2:
+            return None
+        elapsed = self.samples[-1][0] - self.samples[0][0]
+        sent = sum(nbytes for _, nbytes in list(self.samples)[1:])
+        return sent / elapsed if elapsed > 0 else None
+
+    def reset(self):
+        self.samples.clear()
+
+
+def format_rate(bytes_per_s):
+    if not bytes_per_s:
+        return ""
+    if bytes_per_s >= 1024 * 1024:
+        return f"{bytes_per_s / 1024 / 1024:.1f} MB/s"
+    return f"{bytes_per_s / 1024:.0f} KB/s"
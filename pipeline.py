@@ -0,0 +1,362 @@
+# pipeline.py
+# asyncio upload -> QR pipeline. Every stage has its own worker count and a
+# bounded queue in front of it, so uploads keep the network busy while
+# earlier images are still being encoded, rasterized and written.
+#
+#   read/hash -> recompress -> upload -> encode -> rasterize -> write
+import asyncio
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import core
+import metrics
+from multipart import MultipartStream
+from render_pool import matrix_png
+from upload_cache import file_digest
+
+STAGES = ("read", "recompress", "upload", "encode", "rasterize", "write")
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_LIMITS = {
+    "read": 4,
+    "recompress": CPU_COUNT,
+    "upload": 8,
+    "encode": CPU_COUNT,
+    "rasterize": CPU_COUNT,
+    "write": 4,
+}
+
+
+def load_aiohttp():
+    # Imported on start() rather than with this module: aiohttp alone
+    # costs the GUIs ~150ms before their first window
+    try:
+        import aiohttp
+    except ImportError:  # optional: uploads fall back to the pooled requests session
+        return None
+    return aiohttp
+
+
+class Job:
+    def __init__(self, path, tag=None, recompress=None, job_id=None, url=None):
+        self.path = path
+        self.tag = tag
+        self.recompress = recompress
+        self.job_id = job_id
+        self.digest = None
+        self.data = None
+        self.filename = os.path.basename(path)
+        self.prepared = None
+        self.url = url
+        self.cached = url is not None
+        self.matrix = None
+        self.png = None
+        self.out_path = None
+        self.error = None
+        self.stage_times = {}
+        self.submitted = time.perf_counter()
+        self.finished = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def total_s(self):
+        return (self.finished or time.perf_counter()) - self.submitted
+
+
+class Pipeline:
+    def __init__(self, api_key, out_dir=None, recompress=None, use_cache=True, limits=None,
+                 queue_size=32, qr_options=None, style=None, executor=None, render_pool=None,
+                 journal=None, journal_queue="default", on_stage=None, on_progress=None, on_result=None):
+        self.api_key = api_key
+        self.out_dir = out_dir
+        self.recompress = recompress
+        self.use_cache = use_cache
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.queue_size = queue_size
+        self.qr_options = qr_options or {}
+        self.style = {"fill_color": "black", "back_color": "white", "box_size": 10}
+        self.style.update(style or {})
+        self.executor = executor
+        self.render_pool = render_pool
+        # Optional job_queue.JobQueue: every state change is written through
+        self.journal = journal
+        self.journal_queue = journal_queue
+        self.on_stage = on_stage
+        # on_progress(job, bytes_sent, bytes_total) while a job uploads
+        self.on_progress = on_progress
+        self.on_result = on_result
+
+        # Without an output directory the pipeline stops at the matrix
+        self.stages = [s for s in STAGES if out_dir or s not in ("rasterize", "write")]
+        self.queues = []
+        self.tasks = []
+        self.pending = 0
+        self.idle = None
+        self.http = None
+        self.aiohttp = None
+        self.own_executor = False
+
+    # -- lifecycle -------------------------------------------------------
+
+    async def start(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max(self.limits.values()))
+            self.own_executor = True
+        if self.out_dir:
+            os.makedirs(self.out_dir, exist_ok=True)
+        self.aiohttp = aiohttp = load_aiohttp()
+        if aiohttp is not None:
+            # Connection setup is timed per request, like uploader.py does for requests
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_start.append(self._connect_started)
+            trace.on_connection_create_end.append(self._connect_ended)
+            self.http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limits["upload"]),
+                timeout=aiohttp.ClientTimeout(sock_connect=5, sock_read=60),
+                trace_configs=[trace],
+            )
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.queues = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        for index, stage in enumerate(self.stages):
+            for _ in range(self.limits[stage]):
+                self.tasks.append(asyncio.create_task(self._worker(index)))
+
+    async def submit(self, path, tag=None, recompress=None, job_id=None, url=None):
+        # Blocks while the first queue is full: that is the backpressure.
+        # job_id/url resume a journal row; a known URL skips the upload.
+        job = Job(path, tag, recompress or self.recompress, job_id, url)
+        if self.journal is not None and job.job_id is None:
+            job.job_id = await self._cpu(self.journal.add, path, self.journal_queue, job.recompress)
+        self.pending += 1
+        self.idle.clear()
+        await self.queues[0].put(job)
+        return job
+
+    async def join(self):
+        await self.idle.wait()
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.http is not None:
+            await self.http.close()
+        if self.own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def run(self, paths):
+        await self.start()
+        try:
+            jobs = [await self.submit(path) for path in paths]
+            await self.join()
+        finally:
+            await self.close()
+        return jobs
+
+    # -- plumbing --------------------------------------------------------
+
+    async def _worker(self, index):
+        stage = self.stages[index]
+        handler = getattr(self, "_" + stage)
+        queue = self.queues[index]
+        while True:
+            job = await queue.get()
+            try:
+                if job.error is None:
+                    started = time.perf_counter()
+                    try:
+                        await handler(job)
+                    except Exception as e:
+                        job.error = str(e)
+                    job.stage_times[stage] = time.perf_counter() - started
+                    metrics.observe("pipeline." + stage, job.stage_times[stage])
+                    self._callback(self.on_stage, job, stage)
+                if index + 1 < len(self.stages):
+                    await self.queues[index + 1].put(job)
+                else:
+                    try:
+                        if job.ok:
+                            await self._record(job, "rendered", qr_path=job.out_path)
+                        else:
+                            await self._record(job, "failed", error=job.error)
+                    except Exception:
+                        # The QR is written; a resume redoes the row at worst
+                        traceback.print_exc()
+                    finally:
+                        self._finish(job)
+            finally:
+                queue.task_done()
+
+    def _callback(self, callback, *args):
+        # A failing GUI callback must not take the job (and join()) with it
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
+
+    def _finish(self, job):
+        job.finished = time.perf_counter()
+        job.data = None
+        job.png = None
+        try:
+            self._callback(self.on_result, job)
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                self.idle.set()
+
+    def _cpu(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _record(self, job, state, **fields):
+        if self.journal is not None and job.job_id is not None:
+            await self._cpu(lambda: self.journal.set_state(job.job_id, state, **fields))
+
+    # -- stages ----------------------------------------------------------
+
+    async def _read(self, job):
+        if job.url:
+            return
+
+        # Only the hash is computed here; the upload streams the file itself
+        def read():
+            if not self.use_cache:
+                return None, None
+            digest = core.upload_cache_key(file_digest(job.path), self.api_key, job.recompress)
+            return digest, core.get_upload_cache().get(digest)
+
+        job.digest, job.url = await self._cpu(read)
+        job.cached = job.url is not None
+
+    async def _recompress(self, job):
+        if job.url or not job.recompress:
+            return
+        from recompress import prepare_for_upload
+        job.prepared = await self._cpu(prepare_for_upload, job.path, job.recompress)
+        job.data = job.prepared.data
+        job.filename = job.prepared.filename
+
+    async def _upload(self, job):
+        if job.url:
+            await self._record(job, "uploaded", url=job.url)
+            return
+        await self._record(job, "uploading")
+        on_progress = None
+        if self.on_progress:
+            on_progress = lambda sent, total: self._callback(self.on_progress, job, sent, total)
+        if self.http is not None:
+            job.url = await self._post(job, on_progress)
+        elif job.data is not None:
+            job.url = await self._cpu(core.get_uploader().upload_bytes, job.data, job.filename,
+                                      self.api_key, on_progress)
+        else:
+            job.url = await self._cpu(core.get_uploader().upload, job.path, self.api_key, on_progress)
+        job.data = None
+        await self._record(job, "uploaded", url=job.url)
+        if self.use_cache:
+            await self._cpu(core.get_upload_cache().put, job.digest, job.url)
+
+    async def _post(self, job, on_progress=None, retries=3, backoff_factor=0.5):
+        # Same retry policy and timing records as uploader.ImgbbUploader:
+        # connection errors, timeouts, 429 and 5xx are retried with backoff
+        from uploader import RETRY_STATUSES, UploadTiming
+        uploader = core.get_uploader()
+        # Recompressed bytes are already in memory; originals stream from disk
+        path = job.path if job.data is None else None
+        with MultipartStream({"key": self.api_key}, "image", job.filename, path=path, data=job.data,
+                             on_progress=on_progress) as stream:
+            headers = {"Content-Type": stream.content_type, "Content-Length": str(stream.total)}
+            request = {"connect_s": 0.0}
+            started = time.perf_counter()
+            for attempt in range(retries + 1):
+                stream.seek(0)
+                sent = time.perf_counter()
+                try:
+                    async with self.http.post(uploader.endpoint, data=stream.chunks(), headers=headers,
+                                              trace_request_ctx=request) as response:
+                        ttfb = time.perf_counter() - sent
+                        body = await response.read()
+                        final = response.status == 200 or response.status not in RETRY_STATUSES or attempt == retries
+                        if final:
+                            uploader.record(UploadTiming(request["connect_s"], ttfb, time.perf_counter() - started,
+                                                         stream.total, attempt))
+                        if response.status == 200:
+                            with metrics.span("json_parse"):
+                                return json.loads(body)["data"]["url"]
+                        if final:
+                            raise Exception("Image upload failed:\n" + body.decode("utf-8", "replace"))
+                except (self.aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == retries:
+                        raise
+                await asyncio.sleep(backoff_factor * (2 ** attempt))
+
+    async def _connect_started(self, session, context, params):
+        context.trace_request_ctx["connect_started"] = time.perf_counter()
+
+    async def _connect_ended(self, session, context, params):
+        request = context.trace_request_ctx
+        request["connect_s"] += time.perf_counter() - request.pop("connect_started")
+
+    async def _encode(self, job):
+        # One pool task per job on purpose: jobs arrive one at a time as
+        # uploads finish and the GUIs wait on each one, so holding them back
+        # to fill a chunk would add latency. Bulk runs chunk in batch.py.
+        if self.render_pool:
+            job.matrix = await asyncio.wrap_future(self.render_pool.submit_matrix(job.url, self.qr_options))
+            return
+
+        job.matrix = await self._cpu(lambda: core.encode_matrix(job.url, **self.qr_options))
+
+    async def _rasterize(self, job):
+        if self.render_pool:
+            job.png = await asyncio.wrap_future(self.render_pool.submit_matrix_png(job.matrix, **self.style))
+        else:
+            job.png = await self._cpu(lambda: matrix_png(job.matrix, **self.style))
+
+    async def _write(self, job):
+        from batch import qr_output_path
+        job.out_path = qr_output_path(self.out_dir, job.path)
+
+        def write():
+            with open(job.out_path, "wb") as f:
+                f.write(job.png)
+
+        await self._cpu(write)
+
+
+class PipelineThread:
+    # Runs one long-lived Pipeline on a private event loop so GUI code can
+    # submit paths from its own thread. Callbacks fire on the loop thread.
+    def __init__(self, **pipeline_kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.pipeline = Pipeline(**pipeline_kwargs)
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.pipeline.start())
+        self.ready.set()
+        self.loop.run_forever()
+
+    def submit(self, path, tag=None, recompress=None, job_id=None, url=None):
+        return asyncio.run_coroutine_threadsafe(
+            self.pipeline.submit(path, tag, recompress, job_id, url), self.loop)
+
+    def stop(self):
+        future = asyncio.run_coroutine_threadsafe(self.pipeline.close(), self.loop)
+        future.result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
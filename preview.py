@@ -0,0 +1,62 @@
+# preview.py
+# Background preview rendering for the GUIs. One worker thread renders QR
+# previews; every request bumps a generation token, and a render that has
+# been superseded is skipped (still queued) or dropped (already running),
+# so only the latest settings ever reach the screen.
+#
+# Debouncing belongs to the GUI toolkit (QTimer / Tk after) and happens
+# before request() is called.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import core
+
+
+class PreviewRenderer:
+    def __init__(self, on_ready, on_error=None):
+        # on_ready(token, matrix, image) and on_error(token, message) are
+        # called on the worker thread; GUIs hop back to their own thread
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="preview")
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def request(self, size, fill_color="black", back_color="white", matrix=None, data=None,
+                qr_options=None, convert=None):
+        # Render `matrix`, or encode `data` first. convert(image) runs on the
+        # worker too, e.g. to build a toolkit image off the GUI thread.
+        with self.lock:
+            self.generation += 1
+            token = self.generation
+        self.executor.submit(self._render, token, size, fill_color, back_color, matrix, data,
+                             qr_options or {}, convert)
+        return token
+
+    def is_current(self, token):
+        return token == self.generation
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+
+    def _render(self, token, size, fill_color, back_color, matrix, data, qr_options, convert):
+        try:
+            if not self.is_current(token):
+                return
+            if matrix is None:
+                matrix = core.encode_matrix(data, **qr_options)
+                if not self.is_current(token):
+                    return
+            image = core.render_matrix(matrix, size, fill_color, back_color)
+            if convert is not None:
+                image = convert(image)
+            if self.is_current(token):
+                self.on_ready(token, matrix, image)
+        except Exception as e:
+            if self.on_error is not None and self.is_current(token):
+                self.on_error(token, str(e))
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,84 @@
+# recompress.py
+# Optional pre-upload stage: shrink and re-encode an image so less goes over
+# the wire. Only the URL matters for the QR code, not the original bytes.
+import io
+import os
+import time
+
+FORMATS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+class RecompressOptions:
+    def __init__(self, max_dimension=2048, format="JPEG", quality=85):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format {format!r}, expected one of {sorted(FORMATS)}")
+        self.max_dimension = max_dimension
+        self.format = format
+        self.quality = quality
+
+    def cache_key(self):
+        # Part of the upload-cache key: different options yield different uploads
+        return f"{self.format}:{self.max_dimension}:{self.quality}"
+
+
+class PreparedUpload:
+    def __init__(self, data, filename, original_bytes, elapsed_s, recompressed):
+        self.data = data
+        self.filename = filename
+        self.original_bytes = original_bytes
+        self.elapsed_s = elapsed_s
+        self.recompressed = recompressed
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - len(self.data)
+
+    def time_saved(self, bytes_per_s):
+        # Upload time no longer spent, minus what the re-encode itself cost
+        if not bytes_per_s:
+            return None
+        return self.bytes_saved / bytes_per_s - self.elapsed_s
+
+    def describe(self, bytes_per_s=None):
+        if not self.recompressed:
+            return "sent original"
+        text = f"-{self.bytes_saved / 1024:.0f} KB"
+        saved = self.time_saved(bytes_per_s)
+        if saved is not None:
+            text += f", ~{saved:.1f}s saved"
+        return text
+
+
+def prepare_for_upload(image_path, options):
+    from PIL import Image, ImageOps
+    started = time.perf_counter()
+    original_bytes = os.path.getsize(image_path)
+    name = os.path.splitext(os.path.basename(image_path))[0] + FORMATS[options.format]
+
+    with Image.open(image_path) as img:
+        if getattr(img, "is_animated", False):
+            return _original(image_path, original_bytes, started)
+
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than a full decode
+        img.draft("RGB", (options.max_dimension, options.max_dimension))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((options.max_dimension, options.max_dimension), Image.Resampling.LANCZOS)
+
+        if options.format == "JPEG" or img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if options.format == "WEBP" and "A" in img.getbands() else "RGB")
+
+        # Saving without exif=/icc_profile= drops the metadata
+        buffer = io.BytesIO()
+        img.save(buffer, format=options.format, quality=options.quality, optimize=True)
+
+    data = buffer.getvalue()
+    if len(data) >= original_bytes:
+        return _original(image_path, original_bytes, started)
+    return PreparedUpload(data, name, original_bytes, time.perf_counter() - started, True)
+
+
+def _original(image_path, original_bytes, started):
+    with open(image_path, "rb") as f:
+        data = f.read()
+    return PreparedUpload(data, os.path.basename(image_path), original_bytes,
+                          time.perf_counter() - started, False)
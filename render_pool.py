@@ -0,0 +1,83 @@
+# render_pool.py
+# Process-pool backend for QR encoding and rasterization. qr.make() and the
+# raster step are pure Python and hold the GIL, so big batches only scale
+# across cores in separate processes.
+#
+# A job is (data, options); options are the keyword arguments of
+# core.encode_matrix plus box_size/fill_color/back_color for PNG output.
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import core
+
+STYLE_KEYS = ("fill_color", "back_color")
+
+
+def encode_matrix(job):
+    data, options = job
+    qr_options = {k: v for k, v in options.items() if k not in STYLE_KEYS}
+    # Rows come back as bytes: far cheaper to pickle than lists of bools.
+    # Each worker process keeps its own matrix cache.
+    return core.encode_matrix(data, **qr_options)
+
+
+def matrix_png(matrix, box_size=10, fill_color="black", back_color="white"):
+    img = core.render_matrix(matrix, len(matrix) * box_size, fill_color, back_color)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_png(job):
+    data, options = job
+    return matrix_png(encode_matrix(job), options.get("box_size", 10),
+                      options.get("fill_color", "black"), options.get("back_color", "white"))
+
+
+def render_pngs(jobs):
+    # Several jobs in one task: one pickling round trip per chunk, not per code
+    return [render_png(job) for job in jobs]
+
+
+class RenderPool:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def chunksize(self, count):
+        # A few chunks per worker keeps IPC overhead low without starving the tail
+        if count is None:
+            return 16
+        return max(1, count // (self.workers * 4))
+
+    def map_png(self, jobs, chunksize=None):
+        jobs = list(jobs)
+        return self.executor.map(render_png, jobs, chunksize=chunksize or self.chunksize(len(jobs)))
+
+    def map_matrices(self, jobs, chunksize=None):
+        jobs = list(jobs)
+        return self.executor.map(encode_matrix, jobs, chunksize=chunksize or self.chunksize(len(jobs)))
+
+    def submit_png(self, data, options):
+        return self.executor.submit(render_png, (data, options))
+
+    def submit_png_chunk(self, jobs):
+        # For producers that cannot hand over the whole list up front, like
+        # batch.py rendering as uploads finish; sized with chunksize()
+        return self.executor.submit(render_pngs, list(jobs))
+
+    def submit_matrix(self, data, options):
+        return self.executor.submit(encode_matrix, (data, options))
+
+    def submit_matrix_png(self, matrix, box_size=10, fill_color="black", back_color="white"):
+        return self.executor.submit(matrix_png, matrix, box_size, fill_color, back_color)
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,360 @@
+# server.py
+# HTTP mode: QR codes and uploads for internal tools, no desktop session.
+#
+#   python server.py --port 8080
+#
+#   GET  /qr?data=https://example.com&size=300&color=navy       -> image/png
+#        optional: bg, format (png/svg/pdf), ec (L/M/Q/H), border, dpi;
+#        size is pixels or "50mm" / "2in" like the exporters take
+#   POST /upload   image bytes, raw (?filename=photo.jpg) or as the
+#                  multipart "image" field; /qr parameters apply to the code
+#                  -> {"url": ..., "qr": "/qr?data=...", "qr_data_uri": "data:image/png;base64,..."}
+#   GET  /metrics  Prometheus text, GET /health
+#
+# A /qr response is fully determined by its parameters, so its ETag is a
+# hash of them: revalidations get a 304 without rendering anything. Bodies
+# are kept in an in-process LRU, and concurrent misses for the same code
+# wait for one render instead of each running the encoder.
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import engine
+import metrics
+from multipart import parse_multipart
+
+DEFAULT_SIZE = 300
+MAX_PIXELS = 4096
+MAX_DPI = 2400
+MAX_DATA_LENGTH = 4096
+MAX_UPLOAD_BYTES = 32 * 1024 * 1024  # imgbb's own limit
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 24 * 3600
+WRITE_BUFFER_SIZE = 64 * 1024
+# Part of every ETag; bump it when the same parameters start rendering
+# different bytes, so clients do not keep revalidating stale codes
+ETAG_VERSION = b"1"
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml", "pdf": "application/pdf"}
+QR_PARAMS = ("data", "size", "dpi", "color", "bg", "format", "ec", "border")
+
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def qr_key(query):
+    # Normalized /qr parameters: (data, format, size, dpi, color, bg, ec, border).
+    # Raises ValueError for anything out of range.
+    data = _param(query, "data")
+    if not data:
+        raise ValueError("Missing data parameter")
+    if len(data) > MAX_DATA_LENGTH:
+        raise ValueError(f"data is longer than {MAX_DATA_LENGTH} characters")
+    format = _param(query, "format", "png").lower()
+    if format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported format {format!r}, expected one of {tuple(CONTENT_TYPES)}")
+    ec = _param(query, "ec", "M").upper()
+    if ec not in ("L", "M", "Q", "H"):
+        raise ValueError(f"Unknown error correction {ec!r}, expected L, M, Q or H")
+    try:
+        border = int(_param(query, "border", 4))
+        dpi = int(_param(query, "dpi")) if _param(query, "dpi") else None
+    except ValueError:
+        raise ValueError("border and dpi must be integers")
+    if not 0 <= border <= 16:
+        raise ValueError("border must be between 0 and 16")
+    if dpi is not None and not 1 <= dpi <= MAX_DPI:
+        raise ValueError(f"dpi must be between 1 and {MAX_DPI}")
+    size = _param(query, "size", str(DEFAULT_SIZE))
+    if size.isdigit():
+        size = int(size)
+    pixels = engine.parse_size(size, dpi or engine.CSS_DPI)[1]
+    if not 0 < pixels <= MAX_PIXELS:
+        raise ValueError(f"size must be between 1 and {MAX_PIXELS} pixels")
+    color = _param(query, "color", engine.DEFAULT_STYLE["fill_color"]).lower()
+    bg = _param(query, "bg", engine.DEFAULT_STYLE["back_color"]).lower()
+    return (data, format, size, dpi, color, bg, ec, border)
+
+
+def etag_for(key):
+    return '"' + hashlib.blake2b(repr(key).encode() + ETAG_VERSION, digest_size=12).hexdigest() + '"'
+
+
+def render_key(key):
+    data, format, size, dpi, color, bg, ec, border = key
+    with metrics.span("http.render"):
+        matrix = engine.encode(data, {"error_correction": ec, "border": border})
+        return engine.render(matrix, {"fill_color": color, "back_color": bg}, size, format, dpi)
+
+
+class ResponseCache:
+    # LRU of rendered bodies, bounded by bytes. get_or_render() is
+    # single-flight: one thread renders a missing key, the others wait for it.
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        while True:
+            with self.lock:
+                body = self.entries.get(key)
+                if body is not None:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                waiter = self.inflight.get(key)
+                if waiter is None:
+                    waiter = self.inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Then look again: the render landed in the cache, or it failed
+            # and this thread gets to try
+            waiter.wait()
+        try:
+            body = render()
+            self.put(key, body)
+            return body
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            waiter.set()
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self.entries[key] = body
+            self.nbytes += len(body)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class QRHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "qr-server"
+    disable_nagle_algorithm = True
+    # Headers and body go out in one send; the base class flushes after
+    # every request
+    wbufsize = WRITE_BUFFER_SIZE
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type, headers=None, head=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_json(self, status, payload, head=False):
+        self.send_body(status, json.dumps(payload).encode(), "application/json", head=head)
+
+    def do_GET(self):
+        self.route(head=False)
+
+    def do_HEAD(self):
+        self.route(head=True)
+
+    def route(self, head):
+        url = urlsplit(self.path)
+        if url.path == "/qr":
+            started = time.perf_counter()
+            self.get_qr(parse_qs(url.query), head)
+            metrics.observe("http.qr", time.perf_counter() - started)
+        elif url.path == "/health":
+            self.send_body(200, b"ok\n", "text/plain", head=head)
+        elif url.path == "/metrics":
+            self.send_body(200, self.server.metrics_text().encode(), "text/plain; version=0.0.4", head=head)
+        else:
+            self.send_json(404, {"error": f"No such endpoint {url.path}"}, head)
+
+    def get_qr(self, query, head):
+        try:
+            key = qr_key(query)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)}, head)
+            return
+        etag = etag_for(key)
+        headers = {"ETag": etag, "Cache-Control": self.server.cache_control}
+        if self.etag_matches(etag):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            body = self.server.cache.get_or_render(key, lambda: render_key(key))
+        except ValueError as e:
+            # Unknown color, or data too long for any QR version
+            self.send_json(400, {"error": str(e)}, head)
+            return
+        self.send_body(200, body, CONTENT_TYPES[key[1]], headers, head)
+
+    def etag_matches(self, etag):
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        tags = [tag.strip() for tag in header.split(",")]
+        return "*" in tags or etag in tags or "W/" + etag in tags
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/upload":
+            self.send_json(404, {"error": f"No such endpoint {url.path}"})
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True
+            self.send_json(411, {"error": "Content-Length required"})
+            return
+        try:
+            length = int(length)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            # Without a usable length the body cannot be skipped either
+            self.close_connection = True
+            self.send_json(400, {"error": "Content-Length must be a non-negative integer"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            self.send_json(413, {"error": f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes"})
+            return
+        body = self.rfile.read(length)
+        started = time.perf_counter()
+        self.post_upload(parse_qs(url.query), body)
+        metrics.observe("http.upload", time.perf_counter() - started)
+
+    def post_upload(self, query, body):
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            filename, data = parse_multipart(content_type, body).get("image", (None, None))
+        else:
+            filename, data = _param(query, "filename"), body
+        if filename:
+            # It becomes a header line of the multipart body sent upstream
+            filename = filename.replace("\r", "").replace("\n", "")
+        if not data:
+            self.send_json(400, {"error": "Empty upload: send the image as the body or a multipart image field"})
+            return
+
+        params = {name: _param(query, name) for name in QR_PARAMS if name != "data" and _param(query, name)}
+        try:
+            # Checked before uploading, so bad options do not cost an upload
+            qr_key(dict({name: [value] for name, value in params.items()}, data=["-"]))
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        try:
+            image_url = engine.upload_bytes(data, filename or "image")
+        except engine.ConfigError as e:
+            self.send_json(503, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(502, {"error": str(e)})
+            return
+
+        params["data"] = image_url
+        key = qr_key({name: [value] for name, value in params.items()})
+        try:
+            qr = self.server.cache.get_or_render(key, lambda: render_key(key))
+        except ValueError as e:
+            self.send_json(400, {"error": str(e), "url": image_url})
+            return
+        self.send_json(200, {
+            "url": image_url,
+            "qr": "/qr?" + urlencode(params),
+            "qr_data_uri": f"data:{CONTENT_TYPES[key[1]]};base64," + base64.b64encode(qr).decode(),
+        })
+
+
+class QRServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+    def __init__(self, address, cache_bytes=DEFAULT_CACHE_BYTES, max_age=DEFAULT_MAX_AGE, quiet=True):
+        super().__init__(address, QRHandler)
+        self.cache = ResponseCache(cache_bytes)
+        self.cache_control = f"public, max-age={max_age}"
+        self.quiet = quiet
+
+    def metrics_text(self):
+        lines = [metrics.REGISTRY.to_prometheus()]
+        for name, value in self.cache.stats().items():
+            kind = "counter" if name in ("hits", "misses") else "gauge"
+            lines.append(f"# TYPE qr_response_cache_{name} {kind}\nqr_response_cache_{name} {value}\n")
+        return "".join(lines)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(port=0, **options):
+    server = QRServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve QR codes and image uploads over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_BYTES / 1024 / 1024,
+                        help="memory for rendered responses")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE, help="Cache-Control max-age for /qr")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = QRServer((args.host, args.port), cache_bytes=int(args.cache_mb * 1024 * 1024),
+                      max_age=args.max_age, quiet=not args.verbose)
+    # Imports and the API key are loaded now, not on the first request
+    engine.warm_up()
+    print(f"QR server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# sheets.py
+# Print sheets: thousands of QR codes tiled onto label pages, as one
+# multi-page PDF (vectors) or one PNG per page at the template's DPI.
+#
+#   python sheets.py urls.txt --out labels.pdf --page a4 --columns 3 --rows 8
+#   python sheets.py items.csv --out sheet.png --page letter --columns 4 --rows 6 --dpi 600
+#
+# Input is a text file (one data string per line) or a CSV with a "data"
+# column and an optional "caption" column; captions default to the data.
+#
+# Items are read lazily and pages are composed one at a time, each from
+# the module matrices of just its own labels (core's matrix LRU), so memory
+# is flat however long the job is. Pages are farmed out to a process pool
+# with a bounded window of pages in flight and written in order: the PDF
+# gets each page's pre-deflated content stream, PNG pages are written by
+# the worker that drew them.
+import argparse
+import csv
+import itertools
+import os
+import sys
+import zlib
+from collections import deque
+from functools import lru_cache
+
+import core
+from export import PT_PER_INCH, PdfWriter, parse_size, pdf_color, pdf_page_content
+
+PAGE_SIZES = {
+    "a3": ("297mm", "420mm"),
+    "a4": ("210mm", "297mm"),
+    "a5": ("148mm", "210mm"),
+    "letter": ("8.5in", "11in"),
+    "legal": ("8.5in", "14in"),
+}
+CAPTION_FONT = "Helvetica"
+# Caption line height as a multiple of the font size
+CAPTION_LEADING = 1.25
+# Pages in flight per worker; bounds memory with a pool
+PAGES_PER_WORKER = 2
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126, from its AFM
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+
+def points(size):
+    # "10mm", "0.5in", "8pt" or a number of points -> points
+    return parse_size(size, PT_PER_INCH)[0] * PT_PER_INCH
+
+
+def page_size(page):
+    # "a4" / "A4", "100mmx150mm" or a (width, height) pair -> (width, height)
+    if not isinstance(page, str):
+        return page
+    name = page.strip().lower()
+    if name in PAGE_SIZES:
+        return PAGE_SIZES[name]
+    if "x" not in name:
+        raise ValueError(f"Unknown page {page!r}; use {', '.join(PAGE_SIZES)} or WIDTHxHEIGHT")
+    return tuple(name.split("x", 1))
+
+
+class LabelTemplate:
+    # Page size and grid; lengths are "mm"/"in"/"cm"/"pt" strings or points.
+    # dpi only matters for PNG output.
+    def __init__(self, page="a4", columns=3, rows=8, margin="10mm", gap="3mm", padding="2mm",
+                 caption=True, caption_size="8pt", dpi=300, landscape=False):
+        width, height = page_size(page)
+        self.width = points(width)
+        self.height = points(height)
+        if landscape:
+            self.width, self.height = self.height, self.width
+        self.columns = columns
+        self.rows = rows
+        self.margin = points(margin)
+        self.gap = points(gap)
+        self.padding = points(padding)
+        self.caption = caption
+        self.caption_size = points(caption_size)
+        self.dpi = dpi
+        if columns < 1 or rows < 1:
+            raise ValueError(f"A sheet needs at least one column and one row, got {columns}x{rows}")
+        self.cell_width = (self.width - 2 * self.margin - (columns - 1) * self.gap) / columns
+        self.cell_height = (self.height - 2 * self.margin - (rows - 1) * self.gap) / rows
+        caption_height = self.caption_size * CAPTION_LEADING if caption else 0.0
+        self.qr_side = min(self.cell_width, self.cell_height - caption_height) - 2 * self.padding
+        if self.qr_side <= 0:
+            raise ValueError(f"{columns}x{rows} labels with these margins leave no room for a QR code")
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def labels(self):
+        # -> (qr_x, qr_y, caption_x, caption_baseline) in points for each
+        # label of a page, from the top left, in PDF coordinates (origin
+        # bottom left); x values are the centre for captions
+        for index in range(self.per_page):
+            row, column = divmod(index, self.columns)
+            left = self.margin + column * (self.cell_width + self.gap)
+            top = self.height - self.margin - row * (self.cell_height + self.gap)
+            qr_x = left + (self.cell_width - self.qr_side) / 2
+            qr_y = top - self.padding - self.qr_side
+            yield qr_x, qr_y, left + self.cell_width / 2, qr_y - self.caption_size
+
+
+def read_items(path):
+    # -> iterator of (data, caption) from a text or CSV file, read lazily
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                if row.get("data"):
+                    yield row["data"], row.get("caption") or row["data"]
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line, line
+
+
+def as_item(item):
+    return (item, item) if isinstance(item, str) else (item[0], item[1])
+
+
+def caption_width(text, size):
+    return sum(HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) < 127 else 556 for c in text) * size / 1000
+
+
+def fit_caption(text, max_width, measure):
+    # Cut to max_width with a trailing "..."; measure(text) -> width
+    if measure(text) <= max_width:
+        return text
+    while text and measure(text + "...") > max_width:
+        text = text[:-1]
+    return text + "..." if text else ""
+
+
+def pdf_string(text):
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+# -- page workers (run in the pool) ---------------------------------------
+
+def pdf_page(job):
+    # -> deflated content stream for one page
+    items, template, style, qr_options, font = job
+    ops = []
+    captions = []
+    for (data, caption), (qr_x, qr_y, text_x, baseline) in zip(items, template.labels()):
+        matrix = core.encode_matrix(data, **qr_options)
+        ops.append(pdf_page_content(matrix, template.qr_side, qr_x, qr_y,
+                                    style["fill_color"], style["back_color"]))
+        if template.caption and caption:
+            size = template.caption_size
+            text = fit_caption(caption, template.cell_width - 2 * template.padding,
+                               lambda t: caption_width(t, size))
+            x = text_x - caption_width(text, size) / 2
+            captions.append(f"BT /{font} {size:.2f} Tf {x:.4f} {baseline:.4f} Td ".encode()
+                            + pdf_string(text) + b" Tj ET")
+    content = "\n".join(ops).encode("ascii")
+    if captions:
+        content += ("\n" + pdf_color(style["fill_color"]) + "\n").encode() + b"\n".join(captions)
+    return zlib.compress(content)
+
+
+@lru_cache(maxsize=8)
+def caption_font(pixels):
+    # Pillow's bundled scalable font (Pillow >= 10.1)
+    from PIL import ImageFont
+    return ImageFont.load_default(size=pixels)
+
+
+def png_page(job):
+    # Draws one page and writes it to its own file -> path
+    items, template, style, qr_options, path = job
+    from PIL import Image, ImageDraw
+    scale = template.dpi / PT_PER_INCH
+    page = Image.new("RGB", (round(template.width * scale), round(template.height * scale)), "white")
+    draw = ImageDraw.Draw(page)
+    font = caption_font(max(1, round(template.caption_size * scale)))
+    for (data, caption), (qr_x, qr_y, text_x, baseline) in zip(items, template.labels()):
+        matrix = core.encode_matrix(data, **qr_options)
+        n = len(matrix)
+        side = round(template.qr_side * scale)
+        # Whole pixels per module keeps every module the same width in print
+        if side >= n:
+            side -= side % n
+        left = round((qr_x + (template.qr_side - side / scale) / 2) * scale)
+        top = round((template.height - qr_y - template.qr_side) * scale)
+        page.paste(core.render_matrix(matrix, side, style["fill_color"], style["back_color"]), (left, top))
+        if template.caption and caption:
+            text = fit_caption(caption, (template.cell_width - 2 * template.padding) * scale,
+                               lambda t: draw.textlength(t, font=font))
+            draw.text((text_x * scale, (template.height - baseline) * scale), text,
+                      fill=style["fill_color"], font=font, anchor="ms")
+    page.save(path, dpi=(template.dpi, template.dpi))
+    return path
+
+
+# -- driver ---------------------------------------------------------------
+
+def pages(items, per_page):
+    # Lazily chunk any iterable into lists of per_page (data, caption) pairs
+    items = map(as_item, items)
+    while True:
+        page = list(itertools.islice(items, per_page))
+        if not page:
+            return
+        yield page
+
+
+def ordered_map(executor, func, jobs, window):
+    # executor.map with at most `window` jobs submitted ahead of the one
+    # being returned, so a long job never queues everything at once
+    pending = deque()
+    for job in jobs:
+        pending.append(executor.submit(func, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def page_path(path, number):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}_p{number:03d}{extension}"
+
+
+def compose(items, path, template=None, format=None, style=None, qr_options=None, processes=None,
+            on_page=None):
+    # items: data strings or (data, caption) pairs, any iterable.
+    # -> output paths: [path] for PDF, one "<stem>_p001.png" per page for PNG.
+    # on_page(number) is called as each page is written.
+    template = template or LabelTemplate()
+    format = (format or path.rsplit(".", 1)[-1]).lower()
+    if format not in ("pdf", "png"):
+        raise ValueError(f"Unsupported sheet format {format!r}, expected pdf or png")
+    style = dict({"fill_color": "black", "back_color": "white"}, **(style or {}))
+    qr_options = qr_options or {}
+    processes = processes or os.cpu_count() or 1
+
+    pdf = None
+    if format == "pdf":
+        pdf = PdfWriter(path, template.width, template.height)
+        font = pdf.font(CAPTION_FONT) if template.caption else None
+        jobs = ((page, template, style, qr_options, font) for page in pages(items, template.per_page))
+        func = pdf_page
+    else:
+        jobs = ((page, template, style, qr_options, page_path(path, number))
+                for number, page in enumerate(pages(items, template.per_page), 1))
+        func = png_page
+
+    pool = None
+    if processes > 1:
+        from render_pool import RenderPool
+        pool = RenderPool(processes)
+        results = ordered_map(pool.executor, func, jobs, processes * PAGES_PER_WORKER)
+    else:
+        results = map(func, jobs)
+
+    paths = []
+    try:
+        for number, result in enumerate(results, 1):
+            if pdf is not None:
+                pdf.add_page(result, compressed=True)
+            else:
+                paths.append(result)
+            if on_page:
+                on_page(number)
+    finally:
+        if pool is not None:
+            pool.close()
+        if pdf is not None:
+            pdf.close()
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tile QR codes onto printable label sheets.")
+    parser.add_argument("source", help="text file with one data string per line, or CSV with data[,caption]")
+    parser.add_argument("--out", default="labels.pdf", help="output .pdf, or .png for one file per page")
+    parser.add_argument("--page", default="a4", help=f"{', '.join(PAGE_SIZES)} or WIDTHxHEIGHT, e.g. 100mmx150mm")
+    parser.add_argument("--landscape", action="store_true")
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=8)
+    parser.add_argument("--margin", default="10mm", help="page margin")
+    parser.add_argument("--gap", default="3mm", help="space between labels")
+    parser.add_argument("--padding", default="2mm", help="space inside each label")
+    parser.add_argument("--no-caption", action="store_true")
+    parser.add_argument("--caption-size", default="8pt")
+    parser.add_argument("--dpi", type=int, default=300, help="PNG resolution")
+    parser.add_argument("--processes", type=int, default=None, help="page workers (default: one per core)")
+    parser.add_argument("--error-correction", choices=sorted(core.ERROR_CORRECTION), default="M")
+    parser.add_argument("--border", type=int, default=4)
+    parser.add_argument("--fill-color", default="black")
+    parser.add_argument("--back-color", default="white")
+    args = parser.parse_args(argv)
+
+    template = LabelTemplate(args.page, args.columns, args.rows, args.margin, args.gap, args.padding,
+                             not args.no_caption, args.caption_size, args.dpi, args.landscape)
+    paths = compose(
+        read_items(args.source), args.out, template,
+        style={"fill_color": args.fill_color, "back_color": args.back_color},
+        qr_options={"error_correction": core.ERROR_CORRECTION[args.error_correction], "border": args.border},
+        processes=args.processes,
+        on_page=lambda number: print(f"\rpage {number}", end="", flush=True),
+    )
+    print()
+    for path in paths:
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+
+from batch import qr_output_path
+
+
+def test_output_names_keep_the_source_extension():
+    names = {os.path.basename(qr_output_path("out", p)) for p in ("in/a.jpg", "in/a.png", "in/a.JPG", "in/a")}
+    assert names == {"a_jpg_qr.png", "a_png_qr.png", "a_JPG_qr.png", "a_qr.png"}
+    assert qr_output_path("out", "in/a.b.webp") == os.path.join("out", "a.b_webp_qr.png")
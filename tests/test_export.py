@@ -0,0 +1,104 @@
+import io
+import re
+import zlib
+
+import pytest
+
+import core
+import export
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    return core.qrcode_matrix("https://i.ibb.co/abc123/photo.jpg", core.ERROR_CORRECT_M, 4)
+
+
+def pixels(img):
+    return img.convert("RGB").tobytes()
+
+
+@pytest.mark.parametrize("size", [None, 100, 333, 1000])
+def test_png_matches_render_matrix(matrix, tmp_path, size):
+    path = tmp_path / "qr.png"
+    export.write_png(matrix, str(path), size, fill_color="#102030", back_color="#f0e0d0")
+    expected = core.render_matrix(matrix, size or len(matrix) * export.DEFAULT_BOX_SIZE, "#102030", "#f0e0d0")
+    with Image.open(path) as img:
+        assert img.mode == "P" and img.size == expected.size
+        assert pixels(img) == pixels(expected)
+
+
+def test_png_to_file_object_with_dpi(matrix):
+    buf = io.BytesIO()
+    export.export_matrix(matrix, buf, "png", "20mm", 300)
+    with Image.open(io.BytesIO(buf.getvalue())) as img:
+        assert img.size == (236, 236)
+        assert round(img.info["dpi"][0]) == 300
+
+
+def xref_offsets(data):
+    start = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    assert data[start:start + 4] == b"xref"
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[start:]).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n ", data[start:])
+    assert len(entries) == count - 1
+    return [int(e) for e in entries]
+
+
+def check_objects(data):
+    for obj_id, offset in enumerate(xref_offsets(data), start=1):
+        assert data[offset:].startswith(f"{obj_id} 0 obj\n".encode())
+
+
+def test_pdf_single_page(matrix, tmp_path):
+    path = tmp_path / "qr.pdf"
+    export.export_matrix(matrix, str(path), size="50mm")
+    data = path.read_bytes()
+    check_objects(data)
+    assert b"/Count 1" in data
+    side = 50 / export.MM_PER_INCH * export.PT_PER_INCH
+    assert f"/MediaBox [0 0 {side:.4f} {side:.4f}]".encode() in data
+
+
+def test_pdf_writer_pages_and_fonts(matrix):
+    buf = io.BytesIO()
+    with export.PdfWriter(buf, 200, 300) as pdf:
+        font = pdf.font()
+        assert pdf.font() == font == "F1"
+        for i in range(3):
+            content = export.pdf_page_content(matrix, 100, 10, 10) + f"\nBT /{font} 8 Tf 10 5 Td (page {i}) Tj ET"
+            pdf.add_page(content if i != 1 else zlib.compress(content.encode()), compressed=i == 1)
+    data = buf.getvalue()
+    check_objects(data)
+    assert b"/Count 3" in data
+    assert data.count(b"/Type /Page ") == 3
+    assert data.count(b"/Font << /F1 3 0 R >>") == 3
+    streams = re.findall(rb"stream\n(.*?)\nendstream", data, re.S)
+    assert [zlib.decompress(s).endswith(f"(page {i}) Tj ET".encode()) for i, s in enumerate(streams)] == [True] * 3
+
+
+@pytest.mark.parametrize("size, dpi, expected", [
+    (300, 96, (300 / 96, 300)),
+    ("1200px", 300, (4.0, 1200)),
+    ("2in", 150, (2.0, 300)),
+    ("25.4mm", 600, (1.0, 600)),
+    ("72pt", 96, (1.0, 96)),
+])
+def test_parse_size(size, dpi, expected):
+    assert export.parse_size(size, dpi) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("size", ["infmm", "nanpx", "1e400px", "12furlongs", "mm"])
+def test_parse_size_rejects(size):
+    with pytest.raises(ValueError):
+        export.parse_size(size, 96)
+
+
+@pytest.mark.parametrize("dpi", [0, -600])
+def test_non_positive_dpi_is_rejected(matrix, dpi):
+    with pytest.raises(ValueError):
+        export.parse_size("50mm", dpi)
+    with pytest.raises(ValueError):
+        export.write_png(matrix, io.BytesIO(), dpi=dpi)
@@ -0,0 +1,68 @@
+# fast_qr must produce exactly qrcode's matrices. One sized payload per
+# version and level keeps this quick; benchmarks/bench_encoder.py runs the
+# exhaustive version.
+import random
+import string
+
+import pytest
+
+import core
+
+fast_qr = pytest.importorskip("fast_qr")
+from qrcode import util  # noqa: E402
+
+LEVELS = (core.ERROR_CORRECT_L, core.ERROR_CORRECT_M, core.ERROR_CORRECT_Q, core.ERROR_CORRECT_H)
+
+
+def byte_capacity(version, ec):
+    header = 4 + (8 if version < 10 else 16)
+    return (util.BIT_LIMIT_TABLE[ec][version] - header) // 8
+
+
+def outcome(encoder, *args):
+    try:
+        return encoder(*args)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def same(data, ec, border=4, version=None):
+    expected = outcome(core.qrcode_matrix, data, ec, border, version)
+    assert outcome(fast_qr.encode, data, ec, border, version) == expected
+
+
+@pytest.mark.parametrize("ec", LEVELS)
+@pytest.mark.parametrize("version", range(1, 41))
+def test_every_version_and_level(version, ec):
+    rng = random.Random(version * 4 + ec)
+    low = byte_capacity(version - 1, ec) + 1 if version > 1 else 1
+    length = rng.randint(low, max(low, byte_capacity(version, ec)))
+    data = "".join(rng.choice(string.printable) for _ in range(length))
+    # Fitted on odd versions, forced on even ones, so both paths are covered
+    same(data, ec, border=version % 5, version=None if version % 2 else version)
+
+
+@pytest.mark.parametrize("data", [
+    "0123456789" * 30,
+    "HELLO WORLD $%*+-./:" * 10,
+    "https://i.ibb.co/abc123/photo.jpg",
+    "12345ABCDEhéllo wörld/?&67890" * 5,
+    "x",
+])
+@pytest.mark.parametrize("ec", LEVELS)
+def test_modes_and_mixed_segments(data, ec):
+    same(data, ec)
+
+
+def test_overflow_errors_match():
+    same("x" * 3000, core.ERROR_CORRECT_H)
+    same("x" * 400, core.ERROR_CORRECT_M, version=5)
+
+
+def test_auto_falls_back_on_unchecked_qrcode(monkeypatch):
+    monkeypatch.setattr(fast_qr, "QRCODE_VERSIONS", ())
+    try:
+        assert core.configure_encoder("auto") is core.qrcode_matrix
+        assert core.configure_encoder("fast") is fast_qr.encode
+    finally:
+        core.configure_encoder()
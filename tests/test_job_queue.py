@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from job_queue import FINISHED, MAX_ATTEMPTS, JobQueue
+from recompress import RecompressOptions
+
+
+@pytest.fixture
+def journal(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    yield queue
+    queue.close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"one")
+    return str(path)
+
+
+def touch(path, content):
+    # A new size and an explicit mtime, so the signature surely changes
+    with open(path, "wb") as f:
+        f.write(content)
+    os.utime(path, (1, 1))
+
+
+def test_ensure_reuses_the_row_for_a_path(journal, image):
+    first = journal.ensure([image], "q")[0]
+    journal.set_state(first["id"], "uploaded", url="https://x/1")
+    again = journal.ensure([image], "q")[0]
+    assert again["id"] == first["id"]
+    assert again["state"] == "uploaded" and again["url"] == "https://x/1"
+
+
+def test_ensure_starts_over_when_the_file_or_options_change(journal, image):
+    row = journal.ensure([image], "q")[0]
+    journal.set_state(row["id"], "rendered", url="https://x/1", qr_path="a_qr.png")
+    touch(image, b"changed")
+    reset = journal.ensure([image], "q")[0]
+    assert (reset["id"], reset["state"], reset["url"], reset["qr_path"]) == (row["id"], "pending", None, None)
+
+    journal.set_state(row["id"], "rendered", url="https://x/2")
+    shrunk = journal.ensure([image], "q", RecompressOptions(max_dimension=512))[0]
+    assert shrunk["state"] == "pending"
+
+
+def test_set_state_fills_in_but_never_clears(journal, image):
+    job_id = journal.add(image, "q")
+    journal.set_state(job_id, "uploaded", url="https://x/1")
+    journal.set_state(job_id, "rendered", qr_path="out.png")
+    row = journal.get(job_id)
+    assert (row["url"], row["qr_path"]) == ("https://x/1", "out.png")
+    with pytest.raises(ValueError):
+        journal.set_state(job_id, "lost")
+
+
+def test_resume_keeps_urls_and_skips_newer_rows(journal, image, tmp_path):
+    uploaded = journal.add(image, "q")
+    journal.set_state(uploaded, "uploaded", url="https://x/1")
+    other = tmp_path / "b.jpg"
+    other.write_bytes(b"two")
+    done = journal.add(str(other), "q")
+    journal.set_state(done, "rendered")
+    rows = journal.resume("q")
+    assert [(r["id"], r["url"]) for r in rows] == [(uploaded, "https://x/1")]
+    assert journal.resume("q", before=0) == []
+
+
+def test_resume_restarts_rows_whose_file_was_edited(journal, image):
+    job_id = journal.add(image, "q")
+    journal.set_state(job_id, "uploaded", url="https://x/1")
+    touch(image, b"edited")
+    (row,) = journal.resume("q")
+    assert row["state"] == "pending" and row["url"] is None
+
+
+def test_resume_drops_missing_files(journal, image):
+    job_id = journal.add(image, "q")
+    os.remove(image)
+    assert journal.resume("q") == []
+    assert journal.get(job_id) is None
+
+
+def test_resume_gives_up_after_max_attempts_until_the_file_changes(journal, image):
+    job_id = journal.add(image, "q")
+    for attempt in range(MAX_ATTEMPTS):
+        assert [r["id"] for r in journal.resume("q")] == [job_id]
+        journal.set_state(job_id, "uploading")
+        journal.set_state(job_id, "failed", error="HTTP 500")
+    assert journal.resume("q") == []
+    touch(image, b"fixed")
+    (row,) = journal.resume("q")
+    assert (row["state"], row["attempts"]) == ("pending", 0)
+
+
+def test_counts_and_clear(journal, image, tmp_path):
+    first = journal.add(image, "q")
+    journal.add(image, "other")
+    journal.set_state(first, "exported")
+    assert journal.counts("q") == {"exported": 1}
+    journal.clear("q", FINISHED)
+    assert journal.counts("q") == {}
+    assert journal.counts("other") == {"pending": 1}
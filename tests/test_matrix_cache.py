@@ -0,0 +1,34 @@
+from matrix_cache import ENTRY_OVERHEAD, MatrixCache
+
+
+def square(n, value=1):
+    return [[value] * n for _ in range(n)]
+
+
+def test_matrix_cache_evicts_least_recently_used():
+    cache = MatrixCache(max_entries=2)
+    a, b, c = square(3), square(4), square(5)
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.get("a") is a
+    cache.put("c", c)
+    assert cache.get("b") is None
+    assert cache.get("a") is a and cache.get("c") is c
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 3, 1)
+    assert stats["hit_rate"] == 0.75
+
+
+def test_matrix_cache_byte_bound():
+    size = 10 * 10 + ENTRY_OVERHEAD
+    cache = MatrixCache(max_entries=100, max_bytes=3 * size)
+    for key in "abcd":
+        cache.put(key, square(10))
+    assert cache.stats()["bytes"] == 3 * size
+    assert cache.get("a") is None
+    cache.put("b", square(10, 0))
+    assert cache.stats()["bytes"] == 3 * size
+    cache.put("huge", square(100))
+    assert cache.get("huge") is None and cache.stats()["entries"] == 3
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+import pytest
+
+from multipart import MultipartStream, parse_multipart
+
+PAYLOAD = bytes(range(256)) * 1000
+FIELDS = {"key": "secret", "expiration": "600"}
+
+
+@pytest.fixture(params=["path", "data", "empty"])
+def stream(request, tmp_path):
+    data = b"" if request.param == "empty" else PAYLOAD
+    if request.param == "data":
+        s = MultipartStream(FIELDS, "image", 'a "b".jpg', data=data, chunk_size=4096)
+    else:
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(data)
+        s = MultipartStream(FIELDS, "image", 'a "b".jpg', path=str(path), chunk_size=4096)
+    s.payload = data
+    yield s
+    s.close()
+
+
+def test_body_round_trips(stream):
+    body = stream.read()
+    assert len(body) == len(stream) == stream.total
+    fields = parse_multipart(stream.content_type, body)
+    assert fields["key"] == (None, b"secret")
+    assert fields["expiration"] == (None, b"600")
+    assert fields["image"] == ('a %22b%22.jpg', stream.payload)
+
+
+def test_rewind_replays_the_same_bytes(stream):
+    first = b"".join(stream)
+    assert stream.read() == b""
+    assert stream.seek(0) == 0
+    assert stream.read(1000) + stream.read() == first
+
+
+def test_seek_whence_and_clamping(stream):
+    body = stream.read()
+    assert stream.seek(-10, os.SEEK_END) == len(body) - 10
+    assert stream.read() == body[-10:]
+    stream.seek(100)
+    assert stream.seek(50, os.SEEK_CUR) == 150
+    assert stream.read(7) == body[150:157]
+    assert stream.seek(-1) == 0
+    assert stream.seek(10, os.SEEK_END) == len(body)
+    assert stream.read(10) == b""
+
+
+def test_reads_across_part_boundaries(stream):
+    body = stream.read()
+    stream.seek(0)
+    pieces = []
+    for size in (1, 3, 97, 4096, 65537):
+        pieces.append(stream.read(size))
+    pieces.append(stream.read())
+    assert b"".join(pieces) == body
+
+
+def test_async_chunks(stream):
+    async def collect():
+        return b"".join([chunk async for chunk in stream.chunks()])
+    body = asyncio.run(collect())
+    stream.seek(0)
+    assert body == stream.read()
+
+
+def test_progress_always_reaches_the_total():
+    seen = []
+    with MultipartStream(FIELDS, "image", "a.jpg", data=PAYLOAD, chunk_size=1000,
+                         on_progress=lambda sent, total: seen.append((sent, total))) as s:
+        list(s)
+    assert seen[-1] == (s.total, s.total)
+    assert [sent for sent, _ in seen] == sorted(sent for sent, _ in seen)
@@ -0,0 +1,88 @@
+import http.client
+import json
+
+import pytest
+
+import engine
+import server
+from server import MAX_DPI, MAX_PIXELS, qr_key
+
+
+def query(**params):
+    return {name: [str(value)] for name, value in params.items()}
+
+
+def test_qr_key_normalizes():
+    assert qr_key(query(data="x")) == ("x", "png", 300, None, "black", "white", "M", 4)
+    assert qr_key(query(data="x", format="SVG", size="50mm", dpi=300, color="Navy", ec="h", border=0)) == (
+        "x", "svg", "50mm", 300, "navy", "white", "H", 0)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"data": "x" * (server.MAX_DATA_LENGTH + 1)},
+    {"data": "x", "format": "gif"},
+    {"data": "x", "ec": "Z"},
+    {"data": "x", "border": "wide"},
+    {"data": "x", "border": 17},
+    {"data": "x", "dpi": "high"},
+    {"data": "x", "dpi": 0},
+    {"data": "x", "dpi": -600},
+    {"data": "x", "dpi": MAX_DPI + 1},
+    {"data": "x", "size": 0},
+    {"data": "x", "size": MAX_PIXELS + 1},
+    {"data": "x", "size": "2in", "dpi": MAX_DPI},
+    {"data": "x", "size": "infmm"},
+    {"data": "x", "size": "12furlongs"},
+])
+def test_qr_key_rejects(params):
+    with pytest.raises(ValueError):
+        qr_key(query(**params))
+
+
+@pytest.fixture
+def qr_server():
+    srv = server.start_in_thread()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def request(srv, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection(*srv.server_address[:2], timeout=10)
+    try:
+        conn.request(method, path, body, headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_etag_revalidation(qr_server):
+    status, headers, body = request(qr_server, "GET", "/qr?data=hello&size=100")
+    assert status == 200 and body.startswith(b"\x89PNG")
+    etag = headers["ETag"]
+    assert etag == server.etag_for(qr_key(query(data="hello", size=100)))
+
+    for match in (etag, "W/" + etag, '"other", ' + etag, "*"):
+        status, headers, body = request(qr_server, "GET", "/qr?data=hello&size=100", headers={"If-None-Match": match})
+        assert (status, headers["ETag"], body) == (304, etag, b"")
+    status, _, body = request(qr_server, "GET", "/qr?data=hello&size=100", headers={"If-None-Match": '"other"'})
+    assert status == 200 and body.startswith(b"\x89PNG")
+    status, headers, _ = request(qr_server, "GET", "/qr?data=hello&size=101")
+    assert headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("path", ["/qr?data=x&size=300&dpi=-600", "/qr?data=x&format=pdf&dpi=-5", "/qr?size=10"])
+def test_bad_parameters_get_400(qr_server, path):
+    status, headers, body = request(qr_server, "GET", path)
+    assert status == 400 and "error" in json.loads(body)
+
+
+def test_upload_filename_cannot_add_header_lines(qr_server, monkeypatch):
+    seen = []
+    monkeypatch.setattr(engine, "upload_bytes", lambda data, filename: seen.append(filename) or "https://i.ibb.co/x.jpg")
+    status, _, body = request(qr_server, "POST", "/upload?filename=a.jpg%0d%0aX-Evil:%201", b"image",
+                              {"Content-Type": "application/octet-stream"})
+    assert status == 200 and json.loads(body)["url"] == "https://i.ibb.co/x.jpg"
+    assert seen == ["a.jpgX-Evil: 1"]
@@ -0,0 +1,26 @@
+import pytest
+
+from sheets import LabelTemplate
+
+A4 = (595.28, 841.89)
+LETTER = (612.0, 792.0)
+
+
+@pytest.mark.parametrize("page, size", [
+    ("a4", A4), ("A4", A4), (" Letter ", LETTER), ("210mmx297mm", A4), ("8.5INx11IN", LETTER),
+    (("210mm", "297mm"), A4),
+])
+def test_page_names_and_sizes(page, size):
+    template = LabelTemplate(page)
+    assert (round(template.width, 2), round(template.height, 2)) == size
+
+
+def test_unknown_page():
+    with pytest.raises(ValueError, match="Unknown page"):
+        LabelTemplate("tabloid")
+
+
+@pytest.mark.parametrize("grid", [{"columns": 0}, {"rows": 0}, {"columns": -2, "rows": -2}, {"columns": 40}])
+def test_grid_without_room(grid):
+    with pytest.raises(ValueError):
+        LabelTemplate(**grid)
@@ -0,0 +1,65 @@
+import types
+
+import pytest
+
+import upload_cache
+from recompress import RecompressOptions
+from upload_cache import UploadCache, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A clock the test moves by hand, so TTL and last_used are deterministic
+    now = types.SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(upload_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def open_cache(tmp_path, **kwargs):
+    return UploadCache(str(tmp_path / "uploads.sqlite3"), **kwargs)
+
+
+def test_upload_cache_round_trip_and_persistence(tmp_path):
+    cache = open_cache(tmp_path)
+    assert cache.get("d1") is None
+    cache.put("d1", "https://i.ibb.co/1")
+    cache.put("d1", "https://i.ibb.co/2")
+    cache.close()
+    cache = open_cache(tmp_path)
+    assert cache.get("d1") == "https://i.ibb.co/2"
+    cache.clear()
+    assert cache.get("d1") is None
+    cache.close()
+
+
+def test_upload_cache_ttl(tmp_path, clock):
+    cache = open_cache(tmp_path, ttl=5)
+    cache.put("d1", "https://i.ibb.co/1")
+    assert cache.get("d1") == "https://i.ibb.co/1"
+    clock.value += 6
+    assert cache.get("d1") is None
+    cache.close()
+
+
+def test_upload_cache_evicts_least_recently_used(tmp_path, clock):
+    cache = open_cache(tmp_path, max_entries=2)
+    for op in ("a", "b", "get a", "c"):
+        clock.value += 1
+        if op == "get a":
+            cache.get("a")
+        else:
+            cache.put(op, f"https://i.ibb.co/{op}")
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    cache.close()
+
+
+def test_cache_key_namespaces():
+    key = cache_key("abc", "https://api.imgbb.com/1/upload", "k1")
+    assert key.startswith("abc@")
+    assert key == cache_key("abc", "https://api.imgbb.com/1/upload", "k1")
+    assert key != cache_key("abc", "https://api.imgbb.com/1/upload", "k2")
+    assert key != cache_key("abc", "http://127.0.0.1:8765/1/upload", "k1")
+    shrunk = cache_key("abc", "https://api.imgbb.com/1/upload", "k1", RecompressOptions(max_dimension=512))
+    assert shrunk.startswith(key + ":") and shrunk != cache_key(
+        "abc", "https://api.imgbb.com/1/upload", "k1", RecompressOptions(max_dimension=1024))
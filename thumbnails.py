@@ -0,0 +1,133 @@
+# thumbnails.py
+# Off-thread, reduced-scale image thumbnails for the GUIs. A 50-megapixel
+# photo decoded in full is ~150 MB and a visible freeze on the GUI thread;
+# here it is decoded on a worker with Pillow's draft() (JPEG's DCT scaling
+# decodes at 1/2, 1/4 or 1/8 size) and reduce(), so a 200px thumbnail never
+# holds more than a few times its own pixels.
+#
+# Results are kept in a small LRU keyed by (path, mtime, file size, box),
+# so reselecting a queue row or re-dropping a file does not decode again,
+# and a file rewritten in place is not served stale.
+#
+# Requests work like PreviewRenderer: each bumps a generation token and
+# superseded requests are skipped. prefetch() warms the cache on the same
+# worker and gives way to the next request().
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+DEFAULT_MAX_ENTRIES = 64
+# draft()/reduce() stop at this multiple of the box; the final resize
+# from there is LANCZOS, which keeps the thumbnail sharp
+REDUCING_GAP = 2.0
+
+
+def file_key(path, box):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, box)
+
+
+def load_thumbnail(path, box):
+    # -> RGB PIL image no larger than box (width, height), aspect kept
+    from PIL import Image
+    with Image.open(path) as image:
+        image.draft("RGB", (int(box[0] * REDUCING_GAP), int(box[1] * REDUCING_GAP)))
+        image.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+        return image.convert("RGB")
+
+
+class ThumbnailCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            image = self.entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        with self.lock:
+            self.entries[key] = image
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ThumbnailLoader:
+    def __init__(self, on_ready, on_error=None, box=(200, 200), max_entries=DEFAULT_MAX_ENTRIES):
+        # on_ready(token, path, image) and on_error(token, path, message)
+        # are called on the worker thread; GUIs hop back to their own thread
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.box = tuple(box)
+        self.cache = ThumbnailCache(max_entries)
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="thumbnail")
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def request(self, path, convert=None):
+        # convert(image) runs on the worker too, e.g. to build a QImage
+        with self.lock:
+            self.generation += 1
+            token = self.generation
+        self.executor.submit(self._load, token, path, convert, True)
+        return token
+
+    def prefetch(self, paths):
+        # Decode into the cache only, most recent request first; at most
+        # max_entries, since more would evict each other
+        token = self.generation
+        for path in list(paths)[:self.cache.max_entries]:
+            self.executor.submit(self._load, token, path, None, False)
+
+    def is_current(self, token):
+        return token == self.generation
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+
+    def get(self, path):
+        # Synchronous, for callers already off the GUI thread
+        key = file_key(path, self.box)
+        image = self.cache.get(key)
+        if image is None:
+            with metrics.span("thumbnail"):
+                image = load_thumbnail(path, self.box)
+            self.cache.put(key, image)
+        return image
+
+    def _load(self, token, path, convert, deliver):
+        try:
+            if not self.is_current(token):
+                return
+            image = self.get(path)
+            if not deliver:
+                return
+            if convert is not None:
+                image = convert(image)
+            if self.is_current(token):
+                self.on_ready(token, path, image)
+        except Exception as e:
+            if deliver and self.on_error is not None and self.is_current(token):
+                self.on_error(token, path, str(e))
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,110 @@
+# upload_cache.py
+# Persistent map from image content hash to the URL imgbb returned for it,
+# so dropping the same bytes again skips the network entirely.
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir():
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "qr-code-generator")
+
+
+def file_digest(path, chunk_size=HASH_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(digest, endpoint, api_key, recompress=None):
+    # URLs are only valid for the host (and account) that issued them: a run
+    # against a test endpoint must never answer for the real one. The
+    # endpoint and key go in hashed, so the cache file holds no secrets.
+    namespace = hashlib.blake2b(f"{endpoint}\0{api_key}".encode(), digest_size=8).hexdigest()
+    key = f"{digest}@{namespace}"
+    if recompress:
+        key += ":" + recompress.cache_key()
+    return key
+
+
+class UploadCache:
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        if path is None:
+            os.makedirs(default_cache_dir(), exist_ok=True)
+            path = os.path.join(default_cache_dir(), "uploads.sqlite3")
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " digest TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS uploads_last_used ON uploads(last_used)")
+        self.conn.commit()
+
+    def get(self, digest):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, created FROM uploads WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            url, created = row
+            if now - created > self.ttl:
+                self.conn.execute("DELETE FROM uploads WHERE digest = ?", (digest,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE uploads SET last_used = ? WHERE digest = ?", (now, digest))
+            self.conn.commit()
+            return url
+
+    def put(self, digest, url):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO uploads (digest, url, created, last_used) VALUES (?, ?, ?, ?)",
+                (digest, url, now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM uploads WHERE created < ?", (now - self.ttl,))
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM uploads").fetchone()
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM uploads WHERE digest IN ("
+                " SELECT digest FROM uploads ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM uploads")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
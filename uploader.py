@@ -0,0 +1,193 @@
+# uploader.py
+# One pooled keep-alive session for every imgbb upload, with timeouts,
+# bounded retries on 5xx/429 and per-request timing.
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+import metrics
+from multipart import MultipartStream
+
+IMGBB_UPLOAD_URL = "https://api.imgbb.com/1/upload"
+
+
+def default_endpoint():
+    # IMGBB_UPLOAD_URL in the environment / .env points uploads elsewhere,
+    # e.g. at imgbb_stub.py for load tests
+    return os.getenv("IMGBB_UPLOAD_URL") or IMGBB_UPLOAD_URL
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Seconds spent in connect() (TCP + TLS) by the current thread's request
+_connect_time = threading.local()
+
+
+def _add_connect_time(seconds):
+    _connect_time.value = getattr(_connect_time, "value", 0.0) + seconds
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect_time(time.perf_counter() - started)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect_time(time.perf_counter() - started)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class UploadTiming:
+    def __init__(self, connect_s, ttfb_s, total_s, bytes_sent, retries):
+        self.connect_s = connect_s      # TCP + TLS handshakes (0 on a reused connection)
+        self.ttfb_s = ttfb_s            # request sent until response headers parsed
+        self.total_s = total_s
+        self.bytes_sent = bytes_sent
+        self.retries = retries
+
+    @property
+    def transfer_s(self):
+        return max(0.0, self.total_s - self.connect_s)
+
+    def as_dict(self):
+        return {
+            "connect_s": self.connect_s,
+            "ttfb_s": self.ttfb_s,
+            "transfer_s": self.transfer_s,
+            "total_s": self.total_s,
+            "bytes_sent": self.bytes_sent,
+            "retries": self.retries,
+        }
+
+
+class ImgbbUploader:
+    def __init__(self, endpoint=None, pool_size=10, connect_timeout=5.0,
+                 read_timeout=60.0, retries=3, backoff_factor=0.5, history=1000):
+        self.endpoint = endpoint or default_endpoint()
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=0,
+                status=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=None,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timings = deque(maxlen=history)
+        self.lock = threading.Lock()
+
+    def post(self, api_key, stream):
+        # stream is a MultipartStream; urllib3 rewinds it on a retry
+        _connect_time.value = 0.0
+        started = time.perf_counter()
+        response = self.session.post(
+            self.endpoint,
+            data=stream,
+            headers={"Content-Type": stream.content_type},
+            timeout=self.timeout,
+        )
+        total = time.perf_counter() - started
+
+        retries = response.raw.retries
+        timing = UploadTiming(
+            connect_s=_connect_time.value,
+            ttfb_s=response.elapsed.total_seconds(),
+            total_s=total,
+            bytes_sent=stream.total,
+            retries=len(retries.history) if retries else 0,
+        )
+        self.record(timing)
+
+        if response.status_code != 200:
+            raise Exception("Image upload failed:\n" + response.text)
+        with metrics.span("json_parse"):
+            url = response.json()["data"]["url"]
+        return url, timing
+
+    def record(self, timing):
+        # Also fed by the asyncio pipeline's aiohttp uploads, so throughput()
+        # and timing_summary() cover both transports
+        with self.lock:
+            self.timings.append(timing)
+        metrics.observe("upload", timing.total_s)
+        metrics.observe("upload.connect", timing.connect_s)
+
+    def upload(self, image_path, api_key, on_progress=None):
+        # on_progress(bytes_sent, bytes_total) is called from this thread
+        with MultipartStream({"key": api_key}, "image", os.path.basename(image_path),
+                             path=image_path, on_progress=on_progress) as stream:
+            url, _ = self.post(api_key, stream)
+        return url
+
+    def upload_bytes(self, data, filename, api_key, on_progress=None):
+        with MultipartStream({"key": api_key}, "image", filename,
+                             data=data, on_progress=on_progress) as stream:
+            url, _ = self.post(api_key, stream)
+        return url
+
+    def throughput(self):
+        # Recent upload speed in bytes/s, None until something was sent
+        with self.lock:
+            timings = list(self.timings)
+        sent = sum(t.bytes_sent for t in timings)
+        elapsed = sum(t.transfer_s for t in timings)
+        return sent / elapsed if sent and elapsed else None
+
+    def timing_summary(self):
+        with self.lock:
+            timings = list(self.timings)
+        if not timings:
+            return {}
+        n = len(timings)
+        return {
+            "requests": n,
+            "new_connections": sum(1 for t in timings if t.connect_s > 0),
+            "mean_connect_s": sum(t.connect_s for t in timings) / n,
+            "mean_transfer_s": sum(t.transfer_s for t in timings) / n,
+            "mean_total_s": sum(t.total_s for t in timings) / n,
+            "retries": sum(t.retries for t in timings),
+        }
+
+    def close(self):
+        self.session.close()
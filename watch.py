@@ -0,0 +1,413 @@
+# watch.py
+# Watch-folder mode: images that land in a directory are uploaded and get a
+# QR code as soon as they have finished arriving.
+#
+#   python watch.py incoming/ --out qr_out
+#   python watch.py /mnt/share/drop --poll --interval 5     (network shares)
+#   python watch.py incoming/ --once                        (catch up, then exit)
+#
+# Changes come from inotify on Linux (through ctypes, no extra dependency),
+# otherwise from rescanning the directory with os.scandir and comparing
+# (size, mtime) against what is already known. inotify does not see writes
+# made by other machines on NFS/SMB mounts; use --poll there.
+#
+# A file is handed over once its size and mtime have not changed for
+# --settle seconds, and, where inotify saw it being written, once the writer
+# has closed it; so half-copied files are never uploaded. Temporary and
+# hidden names (".x.jpg.tmp", "x.jpg.part") are not images and are ignored
+# until they are renamed into place.
+#
+# The job journal (queue "watch") is the persistent index: on restart,
+# files whose journal row is finished and unchanged on disk are skipped,
+# rows an earlier run left unfinished resume where they stopped (a known URL
+# is not uploaded again), and the upload cache turns re-dropped bytes under
+# a new name into a cache hit. Lag is measured from the first sign of a
+# file to its QR PNG being written.
+import argparse
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+
+import core
+import metrics
+from batch import IMAGE_EXTENSIONS, percentile
+from job_queue import FINISHED, MAX_ATTEMPTS, JobQueue, file_signature
+
+JOURNAL_QUEUE = "watch"
+DEFAULT_SETTLE = 2.0
+DEFAULT_INTERVAL = 1.0
+# A failed file (network down, 5xx after retries) goes round again this
+# many seconds later, even if nothing touches it, doubling after each
+# failure; after job_queue.MAX_ATTEMPTS failures it waits for the file to
+# change
+RETRY_DELAY = 30.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_inotify():
+    # libc with inotify_init1/inotify_add_watch, or None off Linux
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):  # optional: fall back to scanning
+        return None
+    return libc
+
+
+def is_candidate(name):
+    return not name.startswith(".") and name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def scan(directory):
+    # -> {path: (size, mtime_ns)} for every image directly in `directory`
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if is_candidate(entry.name) and entry.is_file():
+                st = entry.stat()
+                found[entry.path] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+class InotifyWatcher:
+    def __init__(self, libc, directory):
+        import ctypes
+        self.directory = directory
+        # Paths modified and not closed yet: a writer still has them open
+        self.writing = set()
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def changes(self, timeout):
+        # -> paths touched since the last call, or None when the kernel
+        # queue overflowed and only a full rescan can tell
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        paths = set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return paths
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self.writing.clear()
+                return None
+            if not is_candidate(name):
+                continue
+            path = os.path.join(self.directory, name)
+            if mask & (IN_CREATE | IN_MODIFY):
+                self.writing.add(path)
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE):
+                self.writing.discard(path)
+            paths.add(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ScanWatcher:
+    # The fallback: a full scandir every `interval` seconds
+    def __init__(self, directory, interval=DEFAULT_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.writing = set()
+        self.known = {}
+        self.next_scan = 0.0
+
+    def changes(self, timeout):
+        wait = self.next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(0.0, wait))
+        self.next_scan = time.monotonic() + self.interval
+        found = scan(self.directory)
+        changed = {path for path, signature in found.items() if self.known.get(path) != signature}
+        self.known = found
+        return changed
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    def __init__(self, directory, out_dir, api_key, journal, settle=DEFAULT_SETTLE, poll=False,
+                 interval=DEFAULT_INTERVAL, upload_workers=4, qr_options=None, style=None,
+                 use_cache=True, on_result=None):
+        self.directory = os.path.abspath(directory)
+        self.out_dir = out_dir
+        self.api_key = api_key
+        self.journal = journal
+        self.settle = settle
+        self.interval = interval
+        self.upload_workers = upload_workers
+        self.qr_options = qr_options or {}
+        self.style = style or {}
+        self.use_cache = use_cache
+        self.on_result = on_result
+        libc = None if poll else load_inotify()
+        self.watcher = InotifyWatcher(libc, self.directory) if libc else ScanWatcher(self.directory, interval)
+        self.mode = "inotify" if libc else "scan"
+        # path -> (size, mtime_ns) last handed to the pipeline
+        self.index = {}
+        # path -> [signature, stable_since, first_seen] while settling
+        self.settling = {}
+        # path -> time of the next attempt after a failure
+        self.retry_at = {}
+        self.in_flight = 0
+        self.lags = []
+        self.lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.stopping = threading.Event()
+        self.pipeline = None
+
+    def load_index(self):
+        # Finished, unchanged files from earlier runs need nothing
+        for row in self.journal.jobs(JOURNAL_QUEUE, FINISHED):
+            if (os.path.dirname(row["path"]) == self.directory and row["qr_path"]
+                    and os.path.exists(row["qr_path"]) and not self.journal.is_stale(row)):
+                self.index[row["path"]] = (row["size"], row["mtime_ns"])
+
+    def start(self):
+        from pipeline import PipelineThread
+        self.load_index()
+        self.pipeline = PipelineThread(
+            api_key=self.api_key,
+            out_dir=self.out_dir,
+            use_cache=self.use_cache,
+            limits={"upload": self.upload_workers},
+            qr_options=self.qr_options,
+            style=self.style,
+            journal=self.journal,
+            journal_queue=JOURNAL_QUEUE,
+            on_result=self._finished,
+        )
+        # Whatever arrived while nobody was watching; files already older
+        # than the settle time go straight through
+        self.observe(scan(self.directory), backlog=True)
+
+    def observe(self, found, backlog=False):
+        now = time.time()
+        for path, signature in found.items():
+            if self.index.get(path) == signature:
+                continue
+            entry = self.settling.get(path)
+            if entry is None:
+                stable_since = min(now, signature[1] / 1e9) if backlog else now
+                self.settling[path] = [signature, stable_since, now]
+            elif entry[0] != signature:
+                entry[0] = signature
+                entry[1] = now
+
+    def check_settled(self):
+        now = time.time()
+        for path, entry in list(self.settling.items()):
+            signature = file_signature(path)
+            if signature == (None, None):
+                del self.settling[path]
+            elif signature != entry[0]:
+                entry[0] = signature
+                entry[1] = now
+            elif now - entry[1] >= self.settle and path not in self.watcher.writing:
+                del self.settling[path]
+                self.submit(path, signature, entry[2])
+
+    def retry_failed(self):
+        now = time.time()
+        with self.lock:
+            due = [path for path, at in self.retry_at.items() if at <= now]
+            for path in due:
+                del self.retry_at[path]
+        signatures = {path: file_signature(path) for path in due}
+        self.observe({path: signature for path, signature in signatures.items()
+                      if signature != (None, None)}, backlog=True)
+
+    def submit(self, path, signature, first_seen):
+        # ensure() reuses the path's journal row and starts it over if the
+        # file changed; an unfinished row with a URL skips the upload
+        row = self.journal.ensure([path], JOURNAL_QUEUE)[0]
+        self.index[path] = signature
+        if row["state"] == "failed" and row["attempts"] >= MAX_ATTEMPTS:
+            # Unchanged since it last failed for good, e.g. after a restart
+            return
+        with self.lock:
+            self.in_flight += 1
+            self.idle.clear()
+        self.pipeline.submit(path, tag=first_seen, job_id=row["id"], url=row["url"])
+
+    def _finished(self, job):
+        # Called on the pipeline thread
+        lag = time.time() - job.tag
+        metrics.observe("watch.lag", lag)
+        row = None if job.ok else self.journal.get(job.job_id)
+        with self.lock:
+            if job.ok:
+                self.lags.append(lag)
+            else:
+                # Forget it and schedule another attempt, unless it is out of
+                # attempts; then it stays indexed until the file changes
+                attempts = row["attempts"] if row else 1
+                if attempts < MAX_ATTEMPTS:
+                    self.index.pop(job.path, None)
+                    self.retry_at[job.path] = time.time() + RETRY_DELAY * 2 ** (attempts - 1)
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self.idle.set()
+        if self.on_result:
+            self.on_result(job, lag)
+
+    def run(self, once=False):
+        # Until stop(), or with once=True until everything present has
+        # settled and been written
+        if self.pipeline is None:
+            self.start()
+        try:
+            while not self.stopping.is_set():
+                timeout = min(self.interval, self.settle / 4) if self.settling else self.interval
+                changed = self.watcher.changes(timeout)
+                if changed is None:
+                    self.observe(scan(self.directory))
+                elif changed:
+                    signatures = {path: file_signature(path) for path in changed}
+                    self.observe({path: signature for path, signature in signatures.items()
+                                  if signature != (None, None)})
+                self.check_settled()
+                self.retry_failed()
+                if once and not self.settling:
+                    self.idle.wait()
+                    break
+        finally:
+            self.close()
+
+    def stop(self):
+        self.stopping.set()
+
+    def close(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        self.watcher.close()
+
+    def lag_summary(self):
+        with self.lock:
+            lags = list(self.lags)
+        return {
+            "files": len(lags),
+            "p50_s": percentile(lags, 50),
+            "p95_s": percentile(lags, 95),
+            "max_s": max(lags, default=0.0),
+        }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Upload images dropped into a folder and write their QR codes.")
+    parser.add_argument("directory", help="folder to watch")
+    parser.add_argument("--out", default="qr_output", help="directory for the QR PNGs")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help="seconds a file must stay unchanged before it is uploaded")
+    parser.add_argument("--poll", action="store_true", help="rescan instead of inotify (network shares)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between rescans")
+    parser.add_argument("--once", action="store_true", help="process what is there, then exit")
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--endpoint", help="upload URL (default: $IMGBB_UPLOAD_URL or imgbb)")
+    parser.add_argument("--no-cache", action="store_true", help="always upload, ignoring the upload cache")
+    parser.add_argument("--journal", help="index of handled files (default: <out>/jobs.sqlite3)")
+    parser.add_argument("--metrics", help="write per-span timings here on exit (.json, else Prometheus text)")
+    parser.add_argument("--error-correction", choices=sorted(core.ERROR_CORRECTION), default="M")
+    parser.add_argument("--fill-color", default="black")
+    parser.add_argument("--back-color", default="white")
+    parser.add_argument("--box-size", type=int, default=10)
+    parser.add_argument("--border", type=int, default=4)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    api_key = core.load_api_key()
+    if not api_key:
+        print("❌ IMGBB_API_KEY not found in .env")
+        return 1
+    if not os.path.isdir(args.directory):
+        print(f"❌ {args.directory} is not a directory")
+        return 1
+    if os.path.abspath(args.out) == os.path.abspath(args.directory):
+        print("❌ --out must not be the watched folder")
+        return 1
+
+    core.configure_uploader(endpoint=args.endpoint, pool_size=args.upload_workers)
+    os.makedirs(args.out, exist_ok=True)
+    journal = JobQueue(args.journal or os.path.join(args.out, "jobs.sqlite3"))
+
+    def report(job, lag):
+        if job.ok:
+            print(f"✅ {job.path} {job.url}  lag {lag:.2f}s")
+        else:
+            print(f"❌ {job.path} {job.error}")
+
+    watcher = FolderWatcher(
+        args.directory, args.out, api_key, journal,
+        settle=args.settle, poll=args.poll, interval=args.interval,
+        upload_workers=args.upload_workers, use_cache=not args.no_cache, on_result=report,
+        qr_options={
+            "error_correction": core.ERROR_CORRECTION[args.error_correction],
+            "border": args.border,
+        },
+        style={"fill_color": args.fill_color, "back_color": args.back_color, "box_size": args.box_size},
+    )
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    watcher.start()
+    print(f"👀 watching {watcher.directory} ({watcher.mode}, settle {args.settle:g}s), "
+          f"{len(watcher.index)} files already done")
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        journal.close()
+
+    if args.metrics:
+        metrics.export(args.metrics)
+    lag = watcher.lag_summary()
+    if lag["files"]:
+        print(f"\n{lag['files']} files, lag p50 {lag['p50_s']:.2f}s, p95 {lag['p95_s']:.2f}s, "
+              f"max {lag['max_s']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())